@@ -1,30 +1,50 @@
 ## LIBRARIES
 # Framework
-from flask import Flask, render_template, jsonify, redirect, url_for, send_from_directory, send_file, request, session
+from flask import Flask, Response, render_template, jsonify, redirect, url_for, send_from_directory, send_file, request, session, stream_with_context
 
-# Data API
-from alpha_vantage.timeseries import TimeSeries
 # Database
 from pymongo import MongoClient
 # Util
 import pandas as pd
 import requests
 import json
-import bcrypt
-import pickle
-from io import BytesIO
-import xlsxwriter
-import re
-
-# Backtesting
-from backtesting import Backtest, Strategy
-# Custom module import
 import os
-import pkgutil
-import inspect
-from importlib import import_module
+import time
+import bcrypt
+
+# Backtesting: backtesting (with bokeh) and the strategies are slow to import, they are imported by the first
+# request that runs a backtest
+from strategy_registry import StrategyRegistry, get_strategy_version, lazy_import
+backtest_tasks = lazy_import('backtest_tasks')
+sweep = lazy_import('sweep')
+walkforward = lazy_import('walkforward')
+plots = lazy_import('plots')
+portfolio = lazy_import('portfolio')
+screener = lazy_import('screener')
+batch = lazy_import('batch')
+from optimizers import OPTIMIZE_METHODS, DEFAULT_BUDGET, build_param_space, get_param_grid, get_grid_size, optimize_random, optimize_halving, optimize_bayesian
+from robustness import DEFAULT_SIMULATIONS, DEFAULT_BLOCK_SIZE, run_monte_carlo
+from charts import DEFAULT_CHART_WIDTH, get_equity_chart
+from exports import export_results
+# Backtest results store
+from result_store import compute_result_key, save_results, load_results, rename_results, delete_results
+# Background jobs
+from jobs import configure_jobs, submit_job, get_job, cancel_job
+from indicator_cache import configure_indicator_cache, get_indicator_cache_stats
+from price_store import configure_price_store, get_price_cache_stats, is_valid_ticker, has_prices, write_prices, list_tickers
+from resampling import configure_resample_cache, get_resample_cache_stats, parse_frequency, normalize_frequency, get_resampled_prices, get_resampled_prices_bulk
+from stock_updater import refresh_stock_data, refresh_intraday_data
+from http_client import configure_http_client, get_http_client_stats, alphavantage_query
+from ticker_index import LISTING_FILE, build_ticker_index
+from fundamentals import configure_fundamentals, get_overview, prefetch_overviews, get_fundamentals_stats
 
 ## CONSTANTS
+OPTIMIZE_METRIC = 'Equity Final [$]'
+OPTIMIZE_RANKING_ROWS = 20
+# Largest number of tickers of a portfolio backtest
+MAX_PORTFOLIO_TICKERS = 500
+# Rows of the leaderboard returned by a screen when the request does not set a limit
+SCREEN_LEADERBOARD_ROWS = 50
 KEY_INDICATORS = ["Return (Ann.) [%]", "Exposure Time [%]", "Volatility (Ann.) [%]", "Return [%]", "Sharpe Ratio", "Buy & Hold Return [%]"]
 
 ## ALPHAVANTAGE API KEYS
@@ -34,25 +54,17 @@ with open('static/tokens.json') as file:
 # Access the keys
 ALPHAVANTAGE_KEY = keys_data['ALPHAVANTAGE_KEY']
 ALPHAVANTAGE_KEY_2 = keys_data['ALPHAVANTAGE_KEY_2']
+# The outbound requests to the API use the keys in turns
+configure_http_client([ALPHAVANTAGE_KEY, ALPHAVANTAGE_KEY_2])
 
-## STRATEGY METHODS
-# Get the directory where the strategy modules are located
-modules_dir = 'modules'
-
-# Create an empty dictionary to store the strategy classes
-strategy_classes = {}
-
-# Iterate over the strategy modules in the directory
-for _, module_name, _ in pkgutil.iter_modules([modules_dir]):
-    # Import the strategy module dynamically
-    module = import_module(f'{modules_dir}.{module_name}')
+## UNIVERSES
+# Named lists of tickers that can be backtested as a portfolio, 'cached' is every ticker in the price store
+with open('static/universes.json') as file:
+    universes = json.load(file)
 
-    # Get the strategy class from the module
-    strategy_class = next((cls for _, cls in inspect.getmembers(module, inspect.isclass) if issubclass(cls, Strategy)), None)
-
-    # Add the strategy class to the dictionary with the module name as key
-    if strategy_class is not None:
-        strategy_classes[module_name] = strategy_class
+## STRATEGY METHODS
+# Strategy classes by the name of their module in the modules directory, imported on first use
+strategy_classes = StrategyRegistry('modules')
 
 ## DATABASE
 # Establish a connection to MongoDB
@@ -73,6 +85,13 @@ users_collection = db['users']
 db = client['backtests_db']
 bt_collection = db['backtests']
 
+# Access the collection for the precomputed backtest results
+results_collection = db['results']
+
+# Access the collection for the cached company overviews
+db = client['fundamentals_db']
+fundamentals_collection = db['overview']
+
 ## FLASK APP
 app = Flask(__name__)
 
@@ -87,6 +106,28 @@ app.config['SESSION_COOKIE_SAMESITE'] = config_data['SESSION_COOKIE_SAMESITE']
 app.config['PERMANENT_SESSION_LIFETIME'] = config_data['PERMANENT_SESSION_LIFETIME']  # 1 week in seconds
 app.permanent_session_lifetime = app.config['PERMANENT_SESSION_LIFETIME']
 
+# Directory of the price files of every ticker (defaults to price_store/) and memory budget in bytes of the
+# series kept in memory (defaults to 512 MB)
+configure_price_store(config_data.get('PRICE_STORE_DIR'), config_data.get('PRICE_CACHE_BYTES'))
+configure_resample_cache(config_data.get('RESAMPLE_CACHE_BYTES'))
+# Timeouts in seconds of the outbound requests and keep-alive connections kept open to every host
+configure_http_client(connect_timeout=config_data.get('HTTP_CONNECT_TIMEOUT'), read_timeout=config_data.get('HTTP_READ_TIMEOUT'),
+                      pool_size=config_data.get('HTTP_POOL_SIZE'))
+# Seconds the company overviews are fresh (defaults to 1 day) and returned while refreshed (defaults to 30 days)
+configure_fundamentals(config_data.get('FUNDAMENTALS_TTL'), config_data.get('FUNDAMENTALS_STALE_TTL'))
+# Memory budget in bytes of the indicator cache of every process (defaults to 256 MB)
+configure_indicator_cache(config_data.get('INDICATOR_CACHE_BYTES'))
+# Symbols searched by the autocomplete: the listing file (defaults to static/listings.csv, downloaded with
+# `python ingest_prices.py --listing`), the cached tickers and the tickers of the universes. The tickers downloaded
+# later are added when they are stored.
+ticker_index = build_ticker_index(config_data.get('TICKER_LISTING_FILE', LISTING_FILE),
+                                  list_tickers() + [ticker for tickers in universes.values() for ticker in tickers])
+# Size of the worker pool for the background jobs (defaults to the number of cores)
+configure_jobs(workers=config_data.get('JOB_WORKERS'), drivers=config_data.get('JOB_DRIVERS'),
+               worker_initializer=(configure_indicator_cache, (config_data.get('INDICATOR_CACHE_BYTES'),)))
+# Combinations per task of the parameter sweeps (defaults to a size based on the number of workers)
+SWEEP_CHUNK_SIZE = config_data.get('SWEEP_CHUNK_SIZE')
+
 ## ROUTES
 @app.route('/')
 def index():
@@ -189,17 +230,20 @@ def logout():
 ## GENERAL METHODS
 @app.route('/search_ticker')
 def search_ticker():
-    query = request.args.get('query')
-    url = f'https://ticker-2e1ica8b9.now.sh/keyword/{query}'
-    data = requests.get(url).json()
-    return data
+    query = request.args.get('query', '')
+    return jsonify(ticker_index.search(query))
 
 @app.route('/get_stock_info', methods=['GET'])
 def get_stock_info():
-    ticker = request.args.get('ticker')
-    url = f'https://www.alphavantage.co/query?function=OVERVIEW&symbol={ticker}&apikey={ALPHAVANTAGE_KEY_2}'
-    response = requests.get(url)
-    data = response.json()
+    ticker = (request.args.get('ticker') or '').strip().upper()
+    if not is_valid_ticker(ticker):
+        return jsonify({'error': f'Invalid ticker "{ticker}".'}), 400
+    try:
+        data, _ = get_overview(fundamentals_collection, ticker, fetch_overview)
+    except requests.RequestException as e:
+        return jsonify({'error': f'The stock information is not available: {e}'}), 502
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
     
     # Check if the response is empty
     if not data:
@@ -207,12 +251,35 @@ def get_stock_info():
     else:
         return data
 
+# Fill the overview cache with the tickers of a watch list (a universe or a list of tickers) in the background
+@app.route('/prefetch_stock_info', methods=['POST'])
+def prefetch_stock_info():
+    data = request.get_json(silent=True) or {}
+    universe = data.get('universe')
+    if data.get('tickers'):
+        tickers = [str(ticker).strip().upper() for ticker in data['tickers']]
+    elif universe == 'cached':
+        tickers = list_tickers()
+    elif universe in universes:
+        tickers = universes[universe]
+    else:
+        return jsonify({'error': 'A universe or a list of tickers is needed.'}), 400
+    invalid = [ticker for ticker in tickers if not is_valid_ticker(ticker)]
+    if invalid:
+        return jsonify({'error': f"Invalid tickers: {', '.join(invalid)}"}), 400
+
+    return jsonify(prefetch_overviews(fundamentals_collection, tickers, fetch_overview)), 202
+
 @app.route('/check_data_availability', methods=['POST'])
 def check_data_availability():
     end_date = request.json['endDate']
     ticker = request.json['ticker']
+    try:
+        frequency = normalize_frequency(request.json.get('frequency') or 1)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    if not check_and_save_stock_data(ticker, end_date):
+    if not check_and_save_stock_data(ticker, end_date, frequency):
         return jsonify({'error': f'Ticker "{ticker}" not found.'}), 404
     else:
         return jsonify({'success': True})
@@ -237,7 +304,7 @@ def get_strategies():
 def get_backtests():
     if 'username' in session:
         username = session['username']
-        backtests = bt_collection.find({'username': username}, {'_id': 0, 'bt_object': 0})  # Exclude the _id and bt_object fields from the result
+        backtests = bt_collection.find({'username': username}, {'_id': 0, 'bt_object': 0})  # Exclude the _id and legacy bt_object fields from the result
         return jsonify(list(backtests))
     else:
         return jsonify({'error': 'You need to be logged in to access your backtests.'}), 401
@@ -246,7 +313,10 @@ def get_backtests():
 def delete_non_permanent_backtests():
     if 'username' in session:
         username = session['username']
-        result = bt_collection.delete_many({'username': username, 'permanent': {'$ne': True}})
+        query = {'username': username, 'permanent': {'$ne': True}}
+        # Delete the stored results of the backtests before the backtests themselves
+        delete_results(results_collection, bt_collection.distinct('name', query))
+        result = bt_collection.delete_many(query)
         return jsonify({'deleted_count': result.deleted_count})
     else:
         return jsonify({'error': 'User not logged in'})
@@ -257,6 +327,7 @@ def delete_backtest(backtest_id):
         username = session['username']
         result = bt_collection.delete_one({'username': username, 'name': backtest_id})
         if result.deleted_count == 1:
+            delete_results(results_collection, [backtest_id])
             return jsonify({'message': 'Backtest deleted successfully.'}), 200
         else:
             return jsonify({'error': 'Backtest not found.'}), 404
@@ -288,9 +359,27 @@ def handle_upload():
     # Get the uploaded strategy file
     strategy_file = request.files.get('strategy_file')
 
-    # Save the strategy file in the modules folder
-    strategy_filename = strategy_name + ".py"
-    strategy_file.save(os.path.join('modules', strategy_filename))
+    # The strategy name is the name of its module
+    if not strategy_name or not strategy_name.isidentifier():
+        return jsonify({'error': 'The strategy name must be a valid Python identifier.'}), 400
+
+    # Save the strategy file in the modules folder, the servers and the workers load it on its next use.
+    # A file that cannot be loaded is replaced by the previous version of the strategy, if there is one.
+    strategy_path = os.path.join('modules', strategy_name + ".py")
+    previous_source = None
+    if os.path.exists(strategy_path):
+        with open(strategy_path, 'rb') as file:
+            previous_source = file.read()
+    strategy_file.save(strategy_path)
+    error = strategy_classes.check(strategy_name)
+    if error:
+        if previous_source is None:
+            os.remove(strategy_path)
+        else:
+            with open(strategy_path, 'wb') as file:
+                file.write(previous_source)
+        strategy_classes.invalidate(strategy_name)
+        return jsonify({'error': f'The strategy could not be loaded: {error}'}), 400
 
     # Prepare the strategy information to be stored in MongoDB
     strategy_info = {
@@ -316,8 +405,9 @@ def handle_upload():
             'description': description
         }
 
-    # Save the strategy information in MongoDB
-    strategies_collection.insert_one(strategy_info)
+    # Save the strategy information in MongoDB, a new version of a strategy replaces the previous one
+    strategies_collection.update_one({'strategy_id': strategy_name, 'users': session['username']},
+                                     {'$set': strategy_info}, upsert=True)
 
     return redirect(f'/select_stocks/{strategy_name}')  # Redirect to the selection of stocks for the strategy
 
@@ -329,74 +419,105 @@ def execute_strategy():
     start_date = request.args.get('startDate')
     end_date = request.args.get('endDate')
     ticker = request.args.get('ticker')
-    frequency = int(request.args.get('frequency'))
     commission = float(request.args.get("commission"))
     backtest_id = request.args.get("backtestId")
+    # Number of daily bars per bar, calendar period ('W', 'M', 'Q', 'Y') or intraday interval ('5min', '1h', ...)
+    try:
+        frequency = normalize_frequency(request.args.get('frequency') or 1)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     # Get the strategy class based on the strategy ID
     selected_strategy_class = strategy_classes.get(strategy_id)
     if selected_strategy_class is None:
         return jsonify({'error': f"Invalid strategy ID: {strategy_id}"}), 404
 
-    if backtest_id == "":
-        # Get stock data for the ticker from MongoDB
-        stock_data = get_stock_data_from_mongodb(ticker, start_date, end_date)
-
-        # Resample to correct frequency
-        data = stock_data.iloc[::frequency]
-
-        # Execute the strategy with the stock data
-        bt = Backtest(data, selected_strategy_class, cash=10000, commission=commission, exclusive_orders=True)
+    # Portfolio mode: the strategy is run on a comma separated list of tickers or on a named universe
+    if request.args.get('tickers') or request.args.get('universe'):
+        universe = request.args.get('universe')
+        if universe == 'cached':
+            tickers = list_tickers()
+        elif universe:
+            if universe not in universes:
+                return jsonify({'error': f'Universe "{universe}" not found.'}), 404
+            tickers = universes[universe]
+        else:
+            tickers = list(dict.fromkeys(t.strip() for t in request.args.get('tickers').split(',') if t.strip()))
+        invalid_tickers = [t for t in tickers if not is_valid_ticker(t)]
+        if invalid_tickers:
+            return jsonify({'error': f'Invalid tickers: {", ".join(invalid_tickers)}'}), 400
+        if not tickers or len(tickers) > MAX_PORTFOLIO_TICKERS:
+            return jsonify({'error': f'A portfolio needs between 1 and {MAX_PORTFOLIO_TICKERS} tickers.'}), 400
+
+        backtest = {
+            'strategy_id': strategy_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'frequency': frequency,
+            'commission': commission
+        }
+        job_id = submit_job('portfolio', session.get('username'), execute_portfolio_job, backtest, tickers)
+        return jsonify({'job_id': job_id})
 
-        # Create a dummy backtest object
-        backtest = {}
+    if backtest_id == "":
+        # Create a backtest record with the inputs of the run
+        backtest = {
+            'strategy_id': strategy_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'ticker': ticker,
+            'frequency': frequency,
+            'commission': commission
+        }
+        name = None
 
-        # Save the bt object in the MongoDB collection if the user is authenticated
+        # Save the backtest record in the MongoDB collection if the user is authenticated
         if 'username' in session:
             username = session['username']
-            bt_pickled = pickle.dumps(bt)
             name = f"{username}_{strategy_id}"
             bt_document = {
                 'username': username,
                 'name': name,
-                'strategy_id': strategy_id,
-                'start_date': start_date,
-                'end_date': end_date,
-                'ticker': ticker,
-                'frequency': frequency,
-                'commission': commission,
-                'bt_object': bt_pickled,
+                **backtest,
                 'permanent': False
             }
             bt_collection.update_one(
                 {'username': username, 'name': name},
-                {'$set': bt_document},
+                {'$set': bt_document, '$unset': {'bt_object': ''}},
                 upsert=True
             )
     else:
-        # Get the backtest object from MongoDB
+        # Get the backtest record from MongoDB
         backtest = bt_collection.find_one({'username': session['username'], 'name': backtest_id})
         if backtest is None:
             return jsonify({'error': 'Backtest not found.'}), 404
-        bt = pickle.loads(backtest['bt_object'])
+        name = backtest_id
 
     try:
-        if backtest.get('opt_values'):
-            opt_values = backtest['opt_values']
-            result = bt.optimize(**opt_values, maximize='Equity Final [$]')
-        else:
-            result = bt.run()
-
-        if result["# Trades"] > 1:
-            # Generate the plot and save it as HTML
-            plot_filename = f"static/html_outputs/{selected_strategy_class.__name__}.html"
-            bt.plot(filename=plot_filename, open_browser=False)
-            # Pass the plot filename and strategy results
-            return jsonify({'output': json.dumps(result[:-3].to_dict(), default=str),
-                            'key_indicators': json.dumps(result[KEY_INDICATORS].to_dict(), default=str), 
-                             'plot_filename': plot_filename}) 
-        else:
-            return jsonify({'error': 'There are not enough trades for this strategy.'}), 404
+        # Identify the results and the plot by the inputs of the backtest
+        result_key = compute_result_key(backtest, get_strategy_version(selected_strategy_class))
+        plot_filename = backtest_tasks.get_plot_filename(selected_strategy_class, result_key)
+
+        # Reuse the stored results for the same inputs
+        result = None
+        if name is not None:
+            result = load_results(results_collection, name, result_key)
+
+        if result is None:
+            # Run the backtest in the background and let the page poll the job
+            job_id = submit_job('execute', session.get('username'), execute_backtest_job, backtest, selected_strategy_class, name,
+                                result_key, plot_filename)
+            return jsonify({'job_id': job_id})
+
+        # The plot may have been removed from disk (or failed), it is rendered again in the background. The prices
+        # are only loaded when the plot is neither on disk nor being rendered.
+        if result['# Trades'] > 1 and plots.get_plot_status(plot_filename)[0] in ('missing', 'failed'):
+            stock_data = get_stock_data(backtest['ticker'], backtest['start_date'], backtest['end_date'], backtest['frequency'])
+            plots.submit_plot(plot_filename, stock_data, selected_strategy_class, backtest)
+        output = format_results(result, plot_filename)
+        if 'error' in output:
+            return jsonify(output), 404
+        return jsonify(output)
     except Exception as e:
         # Return an error message
         return jsonify({'error': 'Error executing strategy.'}), 404
@@ -419,6 +540,10 @@ def save_backtest():
     if old_backtest_name == "":
         old_backtest_name = f"{username}_{strategy_id}"
 
+    # The names identify the Backtests and their stored results, so a name that is taken cannot be reused
+    if backtest_name != old_backtest_name and bt_collection.count_documents({'name': backtest_name}, limit=1):
+        return jsonify({'error': f'There is already a Backtest named "{backtest_name}".'}), 409
+
     # Perform the update operation in MongoDB
     result = bt_collection.update_one(
         {'name': old_backtest_name},
@@ -426,6 +551,8 @@ def save_backtest():
     )
 
     if result.modified_count > 0:
+        # Keep the stored results attached to the renamed Backtest
+        rename_results(results_collection, old_backtest_name, backtest_name)
         # Redirect to the display_results route with the updated backtest_id parameter
         return jsonify({"backtestId": backtest_name})
     else:
@@ -444,26 +571,67 @@ def download_data():
             backtest_name = f"{username}_{strategy_id}"
 
         # Fetch the bt object from MongoDB
-        bt_document = bt_collection.find_one({'name': backtest_name})
+        bt_document = bt_collection.find_one({'username': username, 'name': backtest_name})
         if bt_document:
-            bt_pickled = bt_document['bt_object']
-            bt = pickle.loads(bt_pickled)
-
-            # Run the bt object to obtain the output
-            if bt_document.get('opt_values'):
-                opt_values = bt_document['opt_values']
-                result = bt.optimize(**opt_values, maximize='Equity Final [$]')
-            else:
-                result = bt.run()
-
-            # Create an ExcelWriter object
-            with pd.ExcelWriter('statistics.xlsx', engine='xlsxwriter') as excel_writer:
-                # Write the DataFrame to the Excel file
-                result[:-2].to_excel(excel_writer, sheet_name='Statistics')
-            # Send the Excel file as a response
-            return send_file('statistics.xlsx', as_attachment=True)
+            result = get_backtest_results(bt_document)
+
+            # Build the file in a buffer of this request and stream it
+            tables = request.args.get('tables')
+            try:
+                chunks, mimetype, filename = export_results(result, backtest_name, request.args.get('format') or 'xlsx',
+                                                            tables.split(',') if tables else None)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return Response(stream_with_context(chunks), mimetype=mimetype,
+                            headers={'Content-Disposition': f'attachment; filename="{filename}"'})
     return jsonify({'error': 'Unauthorized.'}), 401
 
+# Monte Carlo robustness of a backtest: distributions of its Sharpe ratio, maximum drawdown and final equity
+# over bootstrap resamples of its trades or of blocks of its bar returns
+@app.route('/robustness', methods=['GET'])
+def robustness():
+    if 'username' not in session:
+        return jsonify({'error': 'You need to be logged in to analyze a backtest.'}), 401
+    username = session['username']
+    backtest_name = request.args.get('backtestId') or f"{username}_{request.args.get('strategyId')}"
+
+    bt_document = bt_collection.find_one({'username': username, 'name': backtest_name})
+    if bt_document is None:
+        return jsonify({'error': 'Backtest not found.'}), 404
+    result = get_backtest_results(bt_document)
+
+    try:
+        seed = request.args.get('seed')
+        analysis = run_monte_carlo(result, method=request.args.get('method') or 'trades',
+                                   n_sims=int(request.args.get('simulations') or DEFAULT_SIMULATIONS),
+                                   block_size=int(request.args.get('blockSize') or DEFAULT_BLOCK_SIZE),
+                                   seed=int(seed) if seed else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(analysis)
+
+# Equity curve, drawdown and trade markers of a backtest, downsampled to the width of the chart. The page fetches
+# it again with the visible date range when the chart is zoomed.
+@app.route('/equity_chart', methods=['GET'])
+def equity_chart():
+    if 'username' not in session:
+        return jsonify({'error': 'You need to be logged in to chart a backtest.'}), 401
+    username = session['username']
+    backtest_name = request.args.get('backtestId') or f"{username}_{request.args.get('strategyId')}"
+
+    bt_document = bt_collection.find_one({'username': username, 'name': backtest_name})
+    if bt_document is None:
+        return jsonify({'error': 'Backtest not found.'}), 404
+    result = get_backtest_results(bt_document)
+
+    try:
+        chart = get_equity_chart(result, width=int(request.args.get('width') or DEFAULT_CHART_WIDTH),
+                                 start_date=request.args.get('start'), end_date=request.args.get('end'),
+                                 method=request.args.get('method') or 'minmax')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(chart)
+
 @app.route('/get_optim_parameters', methods=['GET'])
 def get_parameter_descriptions():
     strategy_id = request.args.get('strategyId')
@@ -513,13 +681,14 @@ def optimize_strategy():
         strategy_params = request.json['formData']
         print(strategy_params)
 
-        # Set up the optimization ranges for each parameter
-        param_ranges = {}
-        for param, value in strategy_params.items():
-            min_value = int(value['min'])
-            max_value = int(value['max']) + 1
-            step_value = int(value['step'])
-            param_ranges[param] = range(min_value, max_value + 1, step_value)
+        # Set up the search space (integer or float range) of each parameter
+        param_space = build_param_space(strategy_params)
+
+        # Search method and maximum number of backtests for the methods that sample the space
+        method = request.json.get('method') or 'grid'
+        budget = int(request.json.get('budget') or DEFAULT_BUDGET)
+        if method not in OPTIMIZE_METHODS:
+            return jsonify({'error': f'Invalid optimization method: {method}'}), 400
 
         # Get the backtest object from MongoDB
         backtest_id = request.json['backtestId']
@@ -531,123 +700,442 @@ def optimize_strategy():
         if backtest is None:
             return jsonify({'error': 'Backtest not found.'}), 404
 
-        bt = pickle.loads(backtest['bt_object'])
-
-        # Optimize the backtest using the parameter ranges
-        res = bt.optimize(**param_ranges, maximize='Equity Final [$]')
-        opt_values = get_opt_values(str(res._strategy))
-
-        # Create the optimized backtest document
-        optimized_backtest = {
-            'username': backtest['username'],
-            'name': backtest_id + "_opt",
-            'strategy_id': backtest['strategy_id'],
-            'start_date': backtest['start_date'],
-            'end_date': backtest['end_date'],
-            'ticker': backtest['ticker'],
-            'frequency': backtest['frequency'],
-            'commission': backtest['commission'],
-            'bt_object': backtest['bt_object'],
-            'opt_values': opt_values,
-            'permanent': False
-        }
-
-        # Update the backtest object in MongoDB with upsert=True
-        bt_collection.update_one(
-            {'username': backtest['username'], 'name': optimized_backtest['name']},
-            {'$set': optimized_backtest},
-            upsert=True
-        )
-
-        # Return the name of the optimized backtest object as JSON
-        return jsonify({'backtestId': optimized_backtest['name'], "opt_values": opt_values})
+        # Optimize the backtest in the background and let the page poll the job
+        job_id = submit_job('optimize', session['username'], optimize_backtest_job, backtest, param_space, method, budget)
+        return jsonify({'job_id': job_id})
 
     except Exception as e:
         # Return an error message
         return jsonify({'error': 'Error optimizing strategy.'}), 500
-    
-## FUNCTIONS
-# Calculate the adjustment factor and create adjusted DataFrame
-def adjust_stock_data(df):
-    df['factor'] = df['4. close'] / df['5. adjusted close']
-    adjusted_df = pd.DataFrame({
-        'Open': df['1. open'] / df['factor'],
-        'High': df['2. high'] / df['factor'],
-        'Low': df['3. low'] / df['factor'],
-        'Close': df['4. close'] / df['factor'],
-        'Volume': df['6. volume'] * df['factor']
-    })
-    return adjusted_df
-
-# Check if the stock data exists in MongoDB, if not fetch from API and save to MongoDB
-def check_and_save_stock_data(ticker, end_date):
-    collection = stock_cache_db[ticker]
-
-    # Check if the data exists for the end date in the collection
-    existing_data = collection.find_one({'date': end_date})
-    if existing_data:
-        return True  # Data already exists in MongoDB
+
+# Screen a strategy with a set of parameters over a universe of tickers and rank them by a statistic
+@app.route('/screen_strategy', methods=['POST'])
+def screen_strategy():
+    data = request.get_json()
+    strategy_id = data.get('strategyId')
+    if strategy_id not in strategy_classes:
+        return jsonify({'error': f"Invalid strategy ID: {strategy_id}"}), 404
+
+    sort_by = data.get('sortBy') or 'Return [%]'
+    if sort_by not in screener.SCREEN_STATS:
+        return jsonify({'error': f'Invalid statistic: {sort_by}'}), 400
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'The parameters must be an object.'}), 400
+
+    # Every ticker in the price store unless a universe or a list of tickers is given
+    universe = data.get('universe') or 'cached'
+    if data.get('tickers'):
+        tickers = list(dict.fromkeys(data['tickers']))
+    elif universe == 'cached':
+        tickers = list_tickers()
+    elif universe in universes:
+        tickers = universes[universe]
+    else:
+        return jsonify({'error': f'Universe "{universe}" not found.'}), 404
+    invalid_tickers = [t for t in tickers if not is_valid_ticker(t)]
+    if invalid_tickers:
+        return jsonify({'error': f'Invalid tickers: {", ".join(map(str, invalid_tickers))}'}), 400
+    if not tickers:
+        return jsonify({'error': 'There are no tickers to screen.'}), 400
+
+    try:
+        backtest = {
+            'strategy_id': strategy_id,
+            'start_date': data.get('startDate'),
+            'end_date': data.get('endDate'),
+            'frequency': normalize_frequency(data.get('frequency') or 1),
+            'commission': float(data.get('commission') or 0)
+        }
+        limit = int(data.get('limit') or SCREEN_LEADERBOARD_ROWS)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid screen parameters.'}), 400
+
+    job_id = submit_job('screen', session.get('username'), screen_strategy_job, backtest, tickers, params, sort_by, limit)
+    return jsonify({'job_id': job_id})
+
+# Run a matrix of strategies, parameter sets and tickers on the worker pool, streaming the result of every cell
+# as it finishes, as NDJSON or as Server-Sent Events when the client accepts text/event-stream
+@app.route('/batch_backtest', methods=['POST'])
+def batch_backtest():
+    data = request.get_json()
+    strategy_ids = data.get('strategies') or list(strategy_classes)
+    invalid_strategies = [s for s in strategy_ids if s not in strategy_classes]
+    if invalid_strategies:
+        return jsonify({'error': f'Invalid strategy IDs: {", ".join(map(str, invalid_strategies))}'}), 404
+
+    tickers = list(dict.fromkeys(data.get('tickers') or []))
+    invalid_tickers = [t for t in tickers if not is_valid_ticker(t)]
+    if not tickers or invalid_tickers:
+        return jsonify({'error': f'Invalid tickers: {", ".join(map(str, invalid_tickers))}'}), 400
+
+    param_sets = data.get('params') or [{}]
+    cells = batch.expand_batch(strategy_ids, param_sets, tickers)
+    if any(not isinstance(cell['params'], dict) for cell in cells):
+        return jsonify({'error': 'Every parameter set must be an object.'}), 400
+    if len(cells) > batch.MAX_BATCH_CELLS:
+        return jsonify({'error': f'A batch can have up to {batch.MAX_BATCH_CELLS} cells.'}), 400
 
     try:
-        # Fetch stock data from the AlphaVantage API
-        app = TimeSeries(ALPHAVANTAGE_KEY)
-        stock_data, _ = app.get_daily_adjusted(symbol=ticker, outputsize='full')
+        backtest = {
+            'start_date': data.get('startDate'),
+            'end_date': data.get('endDate'),
+            'frequency': normalize_frequency(data.get('frequency') or 1),
+            'commission': float(data.get('commission') or 0)
+        }
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid batch parameters.'}), 400
+
+    # The prices of every ticker are loaded once and shared by all its cells
+    stock_data = get_resampled_prices_bulk(tickers, backtest['start_date'], backtest['end_date'], backtest['frequency'])
+    records = batch.run_batch(cells, stock_data, strategy_classes, backtest)
+    if data.get('format') == 'sse' or request.accept_mimetypes.best == 'text/event-stream':
+        return Response(stream_with_context(batch.format_sse(records)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    return Response(stream_with_context(batch.format_ndjson(records)), mimetype='application/x-ndjson')
+
+# Walk-forward analysis: optimize the strategy on rolling in-sample windows and evaluate every window on the bars that follow
+@app.route('/walk_forward', methods=['POST'])
+def walk_forward():
+    try:
+        # Set up the search space (integer or float range) of each parameter, every window searches the whole grid
+        param_space = build_param_space(request.json['formData'])
+        grid_size = get_grid_size(param_space)
+        if grid_size > walkforward.MAX_WALK_FORWARD_COMBOS:
+            return jsonify({'error': f'The walk-forward grid can have up to {walkforward.MAX_WALK_FORWARD_COMBOS} combinations.'}), 400
+        in_sample_bars = int(request.json['inSampleBars'])
+        out_of_sample_bars = int(request.json['outOfSampleBars'])
+        anchored = bool(request.json.get('anchored'))
+
+        # Get the backtest object from MongoDB
+        backtest_id = request.json['backtestId']
+        strategy_id = request.json['strategyId']
+        # Check if the strategy is not saved
+        if backtest_id == "":
+            backtest_id = f"{session['username']}_{strategy_id}"
+        backtest = bt_collection.find_one({'username': session['username'], 'name': backtest_id})
+        if backtest is None:
+            return jsonify({'error': 'Backtest not found.'}), 404
+
+        job_id = submit_job('walk_forward', session['username'], walk_forward_job, backtest, param_space,
+                            in_sample_bars, out_of_sample_bars, anchored)
+        return jsonify({'job_id': job_id})
+
+    except Exception as e:
+        # Return an error message
+        return jsonify({'error': 'Error starting the walk-forward analysis.'}), 500
+
+## JOB METHODS
+# Status of a background job, including its result once it is done
+@app.route('/job_status/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None or job.username != session.get('username'):
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job.to_dict(include_result=True))
+
+# Progress of a background job (work units done / total and estimated remaining seconds)
+@app.route('/job_progress/<job_id>', methods=['GET'])
+def job_progress(job_id):
+    job = get_job(job_id)
+    if job is None or job.username != session.get('username'):
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job.to_dict())
+
+# Cancel a queued or running background job
+@app.route('/cancel_job/<job_id>', methods=['POST'])
+def cancel_background_job(job_id):
+    job = get_job(job_id)
+    if job is None or job.username != session.get('username'):
+        return jsonify({'error': 'Job not found.'}), 404
+    if not cancel_job(job_id):
+        return jsonify({'error': 'The job has already finished.'}), 409
+    return jsonify({'cancelled': True})
+
+## PLOT METHODS
+# State of the rendering of a plot, the page loads the plot file once it is ready
+@app.route('/plot_status/<plot_name>', methods=['GET'])
+def plot_status(plot_name):
+    plot_filename = plots.get_plot_path(plot_name)
+    if plot_filename is None:
+        return jsonify({'error': 'Plot not found.'}), 404
+    status, error = plots.get_plot_status(plot_filename)
+    return jsonify({'status': status, 'plot_filename': plot_filename, 'error': error})
+
+## CACHE METHODS
+# Hit ratio and memory use of the caches of the server process, to tune their budgets
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'prices': get_price_cache_stats(), 'resampled': get_resample_cache_stats(),
+                    'indicators': get_indicator_cache_stats(), 'http': get_http_client_stats(),
+                    'fundamentals': get_fundamentals_stats(fundamentals_collection)})
+
+## JOB DRIVERS
+# Run a backtest record in the worker processes and store its results. The strategy class is the version its
+# result key was computed with, even if the strategy is uploaded again meanwhile.
+def execute_backtest_job(job, backtest, strategy_class, name, result_key, plot_filename):
+    stock_data = get_stock_data(backtest['ticker'], backtest['start_date'], backtest['end_date'], backtest['frequency'])
+
+    job.set_total(1)
+    result = job.submit(backtest_tasks.execute_backtest_task, stock_data, strategy_class, backtest).result()
+    job.advance()
+
+    if name is not None:
+        save_results(results_collection, name, result_key, result)
+    # The results are returned right away and the page loads the plot once it is rendered
+    if result['# Trades'] > 1:
+        plots.submit_plot(plot_filename, stock_data, strategy_class, backtest)
+    return format_results(result, plot_filename)
+
+# Run a backtest on every ticker of a portfolio in the worker processes and combine their equity curves
+def execute_portfolio_job(job, backtest, tickers):
+    strategy_class = strategy_classes[backtest['strategy_id']]
+
+    # Load the prices of all the tickers at once, the ones without stored prices are reported as missing
+    stock_data = get_resampled_prices_bulk(tickers, backtest['start_date'], backtest['end_date'], backtest['frequency'])
+    missing = [ticker for ticker in tickers if ticker not in stock_data]
+    if not stock_data:
+        raise ValueError('There is no stock data for any of the tickers.')
+
+    job.set_total(len(stock_data))
+    futures = {job.submit(portfolio.portfolio_backtest_task, ticker, data, strategy_class, backtest): ticker
+               for ticker, data in stock_data.items()}
+    results = {}
+    errors = {}
+    for future in job.iter_completed(futures):
+        ticker = futures[future]
+        try:
+            results[ticker] = future.result()
+        except Exception as e:
+            errors[ticker] = str(e)
+        job.advance()
+    if not results:
+        raise ValueError('The strategy could not be run on any of the tickers.')
+
+    # Equal weighted portfolio of the tickers
+    equity = portfolio.combine_equity_curves({ticker: result['equity'] for ticker, result in results.items()})
+    return {
+        'strategy_id': backtest['strategy_id'],
+        'tickers': [{'ticker': ticker, **results[ticker]['stats']} for ticker in tickers if ticker in results],
+        'missing': missing,
+        'errors': errors,
+        'portfolio': {**portfolio.get_portfolio_stats(equity), '# Trades': sum(result['stats']['# Trades'] for result in results.values())},
+        'equity_curve': {'dates': equity.index.strftime('%Y-%m-%d').tolist(), 'equity': equity.round(2).tolist()}
+    }
 
-        # Convert stock_data to DataFrame
-        df = pd.DataFrame.from_dict(stock_data, orient='index').astype(float)
-        df.index = pd.to_datetime(df.index)
-        df = df.sort_index(ascending=True)
+# Screen a strategy over many tickers in the worker processes and return the best ones
+def screen_strategy_job(job, backtest, tickers, params, sort_by, limit):
+    strategy_class = strategy_classes[backtest['strategy_id']]
+    stock_data = get_resampled_prices_bulk(tickers, backtest['start_date'], backtest['end_date'], backtest['frequency'])
+    missing = [ticker for ticker in tickers if ticker not in stock_data]
+    if not stock_data:
+        raise ValueError('There is no stock data for any of the tickers.')
+
+    screen = screener.run_screen(stock_data, strategy_class, backtest, params, sort_by, job=job)
+    print(f"Screened {backtest['strategy_id']} on {screen['evaluated']} tickers in {screen['elapsed']:.2f}s")
+    leaderboard = screen['leaderboard'].head(limit)
+    return {'strategy_id': backtest['strategy_id'], 'params': params, 'sort_by': sort_by,
+            'leaderboard': json.loads(leaderboard.reset_index().to_json(orient='records')),
+            'missing': missing, 'errors': screen['errors'],
+            'evaluated': screen['evaluated'], 'elapsed': screen['elapsed']}
+
+# Search the parameter space of a backtest record on the worker pool and store the best run as the optimized backtest
+def optimize_backtest_job(job, backtest, param_space, method='grid', budget=DEFAULT_BUDGET):
+    strategy_class = strategy_classes[backtest['strategy_id']]
+    stock_data = get_stock_data(backtest['ticker'], backtest['start_date'], backtest['end_date'], backtest['frequency'])
+
+    start_time = time.perf_counter()
+    # Indicators computed and reused by the workers during the search
+    cache_stats = {'hits': 0, 'misses': 0}
+    if method == 'grid':
+        # Evaluate every combination in the worker processes, keeping track of the progress
+        search = sweep.run_sweep(stock_data, strategy_class, backtest, sweep.expand_grid(get_param_grid(param_space)), OPTIMIZE_METRIC,
+                                 job=job, chunk_size=SWEEP_CHUNK_SIZE)
+        search['ranking'] = search['ranking'].drop(columns='grid_index')
+        cache_stats = search['indicator_cache']
+    else:
+        # Evaluate the combinations proposed by the search method over the last fraction of the stock data
+        def evaluate(param_combos, fraction):
+            window = stock_data.iloc[-max(int(len(stock_data) * fraction), 1):]
+            window_search = sweep.run_sweep(window, strategy_class, backtest, param_combos, OPTIMIZE_METRIC,
+                                            job=job, chunk_size=SWEEP_CHUNK_SIZE, update_total=False)
+            for counter in cache_stats:
+                cache_stats[counter] += window_search['indicator_cache'][counter]
+            return window_search['scores']
+
+        optimizers = {'random': optimize_random, 'halving': optimize_halving, 'bayesian': optimize_bayesian}
+        search = optimizers[method](evaluate, param_space, budget=budget, progress=job)
+    elapsed = time.perf_counter() - start_time
+    opt_values = search['best_params']
+    print(f"Optimized {backtest['name']} ({method}): {search['evaluated']} backtests in {elapsed:.2f}s "
+          f"({search['evaluated'] / elapsed:.1f} backtests/sec, indicator cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+
+    # Create the optimized backtest document
+    optimized_backtest = {
+        'username': backtest['username'],
+        'name': backtest['name'] + "_opt",
+        'strategy_id': backtest['strategy_id'],
+        'start_date': backtest['start_date'],
+        'end_date': backtest['end_date'],
+        'ticker': backtest['ticker'],
+        'frequency': backtest['frequency'],
+        'commission': backtest['commission'],
+        'opt_values': opt_values,
+        'permanent': False
+    }
 
-        # Adjust the stock data
-        adjusted_df = adjust_stock_data(df)
+    # Run and plot the best combination
+    result_key = compute_result_key(optimized_backtest, get_strategy_version(strategy_class))
+    plot_filename = backtest_tasks.get_plot_filename(strategy_class, result_key)
+    result = job.submit(backtest_tasks.execute_backtest_task, stock_data, strategy_class, optimized_backtest).result()
+    if result['# Trades'] > 1:
+        plots.submit_plot(plot_filename, stock_data, strategy_class, optimized_backtest)
+
+    # Update the backtest object in MongoDB with upsert=True
+    bt_collection.update_one(
+        {'username': backtest['username'], 'name': optimized_backtest['name']},
+        {'$set': optimized_backtest, '$unset': {'bt_object': ''}},
+        upsert=True
+    )
 
-        # Convert the index (date) to strings before saving to MongoDB
-        adjusted_df.index = adjusted_df.index.strftime('%Y-%m-%d')
+    # Store the results of the best run so the optimized backtest is not simulated again
+    save_results(results_collection, optimized_backtest['name'], result_key, result)
+
+    # Return the name of the optimized backtest object, with the best combinations and the search throughput
+    ranking = search['ranking'].head(OPTIMIZE_RANKING_ROWS)
+    return {'backtestId': optimized_backtest['name'], 'opt_values': opt_values, 'method': method,
+            'ranking': json.loads(ranking.reset_index().to_json(orient='records')),
+            'evaluated': search['evaluated'], 'elapsed': elapsed, 'throughput': search['evaluated'] / elapsed,
+            'indicator_cache': cache_stats}
+
+# Run a walk-forward analysis of a backtest record on the worker pool and store it as a backtest whose optimized
+# values are the ones of the last window, with the values chosen for every window
+def walk_forward_job(job, backtest, param_space, in_sample_bars, out_of_sample_bars, anchored):
+    strategy_class = strategy_classes[backtest['strategy_id']]
+    stock_data = get_stock_data(backtest['ticker'], backtest['start_date'], backtest['end_date'], backtest['frequency'])
+    param_combos = sweep.expand_grid(get_param_grid(param_space))
+
+    analysis = walkforward.run_walk_forward(stock_data, strategy_class, backtest, param_combos, in_sample_bars, out_of_sample_bars,
+                                OPTIMIZE_METRIC, anchored=anchored, job=job)
+    print(f"Walk-forward of {backtest['name']}: {len(analysis['windows'])} windows, "
+          f"{analysis['evaluated']} backtests in {analysis['elapsed']:.2f}s")
+
+    windows = analysis['windows']
+    walk_forward_backtest = {
+        'username': backtest['username'],
+        'name': backtest['name'] + "_wf",
+        'strategy_id': backtest['strategy_id'],
+        'start_date': backtest['start_date'],
+        'end_date': backtest['end_date'],
+        'ticker': backtest['ticker'],
+        'frequency': backtest['frequency'],
+        'commission': backtest['commission'],
+        'opt_values': windows[-1]['opt_values'],
+        'walk_forward': {
+            'in_sample_bars': in_sample_bars,
+            'out_of_sample_bars': out_of_sample_bars,
+            'anchored': anchored,
+            'windows': [{key: window[key] for key in ('in_sample', 'out_of_sample', 'opt_values')} for window in windows]
+        },
+        'permanent': False
+    }
+    bt_collection.update_one(
+        {'username': backtest['username'], 'name': walk_forward_backtest['name']},
+        {'$set': walk_forward_backtest, '$unset': {'bt_object': ''}},
+        upsert=True
+    )
 
-        # Delete the existing collection for the ticker
-        client['stock_cache_db'].drop_collection(ticker)
+    equity = analysis['equity']
+    return {'backtestId': walk_forward_backtest['name'], 'opt_values': walk_forward_backtest['opt_values'],
+            'windows': windows, 'stats': analysis['stats'],
+            'equity_curve': {'dates': equity.index.strftime('%Y-%m-%d').tolist(), 'equity': equity.round(2).tolist()},
+            'evaluated': analysis['evaluated'], 'elapsed': analysis['elapsed']}
 
-        # Store the adjusted data in a new collection
-        collection.insert_many(adjusted_df.rename_axis('Date').reset_index().to_dict(orient='records'))
+## FUNCTIONS
+# Company overview of a ticker from the AlphaVantage API, empty if the API does not know the ticker
+def fetch_overview(ticker):
+    return alphavantage_query({'function': 'OVERVIEW', 'symbol': ticker})
+
+# Check if the stock data exists in the price store, if not fetch the missing bars from API and save them to the store.
+# Intraday frequencies need the intraday series of their interval.
+def check_and_save_stock_data(ticker, end_date, frequency=1):
+    if not is_valid_ticker(ticker):
+        return False
+
+    interval = parse_frequency(frequency)['interval']
+    if interval is not None:
+        try:
+            refresh_intraday_data(ticker, interval, end_date, None)
+            ticker_index.add([(ticker, '')])
+            return True
+        except (ValueError, requests.RequestException) as e:
+            print(f"Error fetching intraday data for ticker '{ticker}': {str(e)}")
+            return False
+
+    # Series cached by previous versions in MongoDB are moved to the price store
+    if not has_prices(ticker):
+        import_mongodb_stock_data(ticker)
 
-        return True  # Data fetched from API and saved to MongoDB
+    try:
+        refresh_stock_data(ticker, end_date, None)
+        # New tickers are searchable without restarting the app
+        ticker_index.add([(ticker, '')])
+        return True  # Data available in the price store
 
-    except ValueError as e:
+    except (ValueError, requests.RequestException) as e:
         print(f"Error fetching data for ticker '{ticker}': {str(e)}")
         return False  # Error occurred while fetching data
-    
-# Get the stock data from MongoDB
-def get_stock_data_from_mongodb(ticker, start_date, end_date):
-    # Access the collection for the specific ticker
-    collection = stock_cache_db[ticker]
 
-    # Retrieve the stock data from MongoDB
-    query = {'Date': {'$gte': start_date, '$lte': end_date}}
+# Move the rows of a ticker cached in the stock_cache_db database to the price store
+def import_mongodb_stock_data(ticker):
+    if ticker not in stock_cache_db.list_collection_names():
+        return False
     projection = {'_id': 0, 'Date': 1, 'Open': 1, 'High': 1, 'Low': 1, 'Close': 1, 'Volume': 1}
-    cursor = collection.find(query, projection)
-
-    stock_data = {document['Date']: {
-        'Open': document['Open'],
-        'High': document['High'],
-        'Low': document['Low'],
-        'Close': document['Close'],
-        'Volume': document['Volume']
-    } for document in cursor}
-
-    # Prepare the data for backtesting
-    data = pd.DataFrame.from_dict(stock_data, orient='index').astype(float)
-    data.index = pd.to_datetime(data.index)
-    data = data.sort_index(ascending=True)
-
-    return data
-
-def get_opt_values(string):
-    parameters_str = re.search(r'\((.*?)\)', string).group(1)
-    parameters = {}
-    for param in parameters_str.split(','):
-        name, value = param.split('=')
-        parameters[name.strip()] = int(value.strip())
-    return parameters
+    documents = list(stock_cache_db[ticker].find({}, projection))
+    if documents:
+        data = pd.DataFrame(documents).set_index('Date').astype(float)
+        data.index = pd.to_datetime(data.index)
+        write_prices(ticker, data)
+    stock_cache_db.drop_collection(ticker)
+    return bool(documents)
+
+# Get the stock data between two dates from the price store, at the frequency of the backtest
+def get_stock_data(ticker, start_date, end_date, frequency=1):
+    return get_resampled_prices(ticker, start_date, end_date, frequency)
+
+# Rebuild the bt object of a backtest record from the cached price series, with the current version of its
+# strategy unless a version is given
+def build_backtest(bt_document, strategy_class=None):
+    strategy_class = strategy_class or strategy_classes.get(bt_document['strategy_id'])
+    if strategy_class is None:
+        raise ValueError(f"Invalid strategy ID: {bt_document['strategy_id']}")
+
+    # Get stock data for the ticker from the price store
+    stock_data = get_stock_data(bt_document['ticker'], bt_document['start_date'], bt_document['end_date'], bt_document['frequency'])
+
+    return backtest_tasks.make_backtest(stock_data, strategy_class, bt_document)
+
+# Stored results of a backtest record, the bt object is only run (and its results stored) if its inputs changed
+def get_backtest_results(bt_document):
+    strategy_class = strategy_classes.get(bt_document['strategy_id'])
+    result_key = compute_result_key(bt_document, get_strategy_version(strategy_class))
+    result = load_results(results_collection, bt_document['name'], result_key)
+    if result is None:
+        bt = build_backtest(bt_document, strategy_class)
+        result = backtest_tasks.run_backtest(bt, bt_document)
+        save_results(results_collection, bt_document['name'], result_key, result)
+    return result
+
+# Prepare the results of a backtest to be displayed in the results page
+def format_results(result, plot_filename):
+    if result["# Trades"] > 1:
+        # Pass the plot filename, where the plot can be polled until it is rendered, and the strategy results
+        return {'output': json.dumps(result[:-3].to_dict(), default=str),
+                'key_indicators': json.dumps(result[KEY_INDICATORS].to_dict(), default=str),
+                'plot_filename': plot_filename,
+                'plot_status_url': f'/plot_status/{os.path.basename(plot_filename)}'}
+    else:
+        return {'error': 'There are not enough trades for this strategy.'}
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,40 @@
+## LIBRARIES
+# Backtesting
+from backtesting import Backtest
+from vectorized import run_fast
+from indicator_cache import cached_strategy, get_data_key
+
+## CONSTANTS
+INITIAL_CASH = 10000
+
+## FUNCTIONS
+# Create the bt object of a backtest record from its stock data, already at the frequency of the record
+# (see resampling.get_resampled_prices)
+def make_backtest(stock_data, strategy_class, bt_document):
+    # Indicators are shared with the other backtests of the same prices
+    strategy_class = cached_strategy(strategy_class, get_data_key(stock_data, bt_document))
+
+    return Backtest(stock_data, strategy_class, cash=INITIAL_CASH, commission=float(bt_document['commission']), exclusive_orders=True)
+
+# Run the simulation of a backtest document, using its optimized parameters if any.
+# Strategies with vectorized signals are simulated over arrays, the rest with Backtest.run().
+def run_backtest(bt, bt_document):
+    opt_values = bt_document.get('opt_values') or {}
+    return run_fast(bt, **opt_values)
+
+# Build the plot file name for the inputs of a backtest
+def get_plot_filename(strategy_class, result_key):
+    return f"static/html_outputs/{strategy_class.__name__}_{result_key[:16]}.html"
+
+# Replace the strategy instance of the results by its description, so they can be sent between processes
+def detach_results(result):
+    result = result.copy()
+    result['_strategy'] = str(result['_strategy'])
+    return result
+
+## WORKER TASKS
+# Run a backtest record, its plot is rendered apart by plots.render_plot_task()
+def execute_backtest_task(stock_data, strategy_class, bt_document):
+    bt = make_backtest(stock_data, strategy_class, bt_document)
+    result = run_backtest(bt, bt_document)
+    return detach_results(result)
@@ -0,0 +1,91 @@
+## LIBRARIES
+# Util
+import json
+import time
+from itertools import product
+from concurrent.futures import as_completed
+
+from json_values import to_json_value
+
+# Backtesting
+from backtest_tasks import make_backtest
+from vectorized import run_fast
+from sweep import share_stock_data, attach_stock_data
+# Background jobs
+import jobs
+
+## CONSTANTS
+# Statistics returned for every cell of a batch
+BATCH_STATS = ['Return [%]', 'Return (Ann.) [%]', 'Volatility (Ann.) [%]', 'Sharpe Ratio', 'Sortino Ratio',
+               'Max. Drawdown [%]', '# Trades', 'Win Rate [%]', 'Exposure Time [%]', 'Buy & Hold Return [%]',
+               'Equity Final [$]']
+# Largest number of strategy x parameters x ticker cells of a batch
+MAX_BATCH_CELLS = 5000
+
+## WORKER TASKS
+# Run one cell of a batch: a strategy with a set of parameters on the shared data of one ticker
+def batch_cell_task(data_descriptor, strategy_class, bt_document, params):
+    stock_data = attach_stock_data(data_descriptor)
+    bt = make_backtest(stock_data, strategy_class, bt_document)
+    result = run_fast(bt, **params)
+    return {column: to_json_value(result[column]) for column in BATCH_STATS}
+
+## FUNCTIONS
+# Cells of a batch, every strategy with each of its parameter sets on every ticker.
+# `param_sets` is a list of parameter sets for all the strategies or a dict with the list of each strategy,
+# the strategies without parameter sets run with their default parameters.
+def expand_batch(strategy_ids, param_sets, tickers):
+    cells = []
+    for strategy_id in strategy_ids:
+        strategy_params = param_sets.get(strategy_id) if isinstance(param_sets, dict) else param_sets
+        for params, ticker in product(strategy_params or [{}], tickers):
+            cells.append({'cell': len(cells), 'strategy_id': strategy_id, 'params': params, 'ticker': ticker})
+    return cells
+
+# Run the cells of a batch on the worker pool and yield every result as soon as its cell finishes.
+# The prices of every ticker are copied once into shared memory, and the cells of a ticker are submitted together
+# so every worker attaches to them once. The cells without stock data are yielded first with an error; closing
+# the generator (e.g. when the client disconnects) cancels the cells that have not started.
+def run_batch(cells, stock_data, strategy_classes, bt_document):
+    start_time = time.perf_counter()
+    shared = {}
+    futures = {}
+    try:
+        for cell in cells:
+            if cell['ticker'] not in stock_data:
+                yield {**cell, 'error': f"There is no stock data for '{cell['ticker']}'."}
+
+        tickers = list(dict.fromkeys(cell['ticker'] for cell in cells if cell['ticker'] in stock_data))
+        order = {ticker: i for i, ticker in enumerate(tickers)}
+        for cell in sorted((cell for cell in cells if cell['ticker'] in order), key=lambda cell: order[cell['ticker']]):
+            if cell['ticker'] not in shared:
+                shared[cell['ticker']] = share_stock_data(stock_data[cell['ticker']])
+            bt_cell = {**bt_document, 'strategy_id': cell['strategy_id'], 'ticker': cell['ticker']}
+            future = jobs.get_process_pool().submit(batch_cell_task, shared[cell['ticker']][1],
+                                                    strategy_classes[cell['strategy_id']], bt_cell, cell['params'])
+            futures[future] = cell
+
+        for future in as_completed(futures):
+            cell = futures[future]
+            try:
+                yield {**cell, 'stats': future.result()}
+            except Exception as e:
+                yield {**cell, 'error': str(e)}
+    finally:
+        for future in futures:
+            future.cancel()
+        for shm, _ in shared.values():
+            shm.close()
+            shm.unlink()
+    yield {'done': True, 'cells': len(cells), 'elapsed': time.perf_counter() - start_time}
+
+# Serialize the results of a batch as newline delimited JSON
+def format_ndjson(records):
+    for record in records:
+        yield json.dumps(record) + '\n'
+
+# Serialize the results of a batch as Server-Sent Events, a 'result' event per cell and a final 'done' event
+def format_sse(records):
+    for record in records:
+        event = 'done' if record.get('done') else 'result'
+        yield f"event: {event}\ndata: {json.dumps(record)}\n\n"
@@ -0,0 +1,67 @@
+## LIBRARIES
+# Util
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+## CONSTANTS
+# Root of the project, where the app is imported from
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Libraries that are only imported by the requests that need them, never when the app starts
+DEFERRED_MODULES = ['backtesting', 'bokeh', 'talib', 'modules', 'xlsxwriter', 'alpha_vantage']
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+## FUNCTIONS
+# Import a module in a new interpreter with -X importtime. Returns the time of every imported module
+# (self and cumulative microseconds, and depth) in import order.
+def profile_import(module):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=PROJECT_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr[-2000:]}')
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            imports.append({'module': match.group(4), 'self_us': int(match.group(1)), 'cumulative_us': int(match.group(2)),
+                            'depth': len(match.group(3)) // 2})
+    return imports
+
+# Print the import time of the app and its slowest imports, and fail if it is slower than a limit or if a
+# deferred library is imported when the app starts
+def main():
+    parser = argparse.ArgumentParser(description='Measure the import time of the app, like python -X importtime.')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to show')
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail if the median import time is higher')
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(args.runs)]
+    totals = [next(item['cumulative_us'] for item in imports if item['module'] == args.module) / 1000 for imports in runs]
+    median = statistics.median(totals)
+    print(f"import {args.module}: median={median:.0f}ms min={min(totals):.0f}ms max={max(totals):.0f}ms runs={args.runs}")
+
+    # Slowest imports of the last run by their cumulative time, indented by their depth in the import tree
+    imports = runs[-1]
+    print(f"{'cumulative':>12} {'self':>9}  module")
+    for item in sorted(imports, key=lambda item: -item['cumulative_us'])[:args.top]:
+        print(f"{item['cumulative_us'] / 1000:>10.1f}ms {item['self_us'] / 1000:>7.1f}ms  {'  ' * item['depth']}{item['module']}")
+
+    failures = []
+    imported = {item['module'] for item in imports}
+    eager = [module for module in DEFERRED_MODULES if module in imported]
+    if eager:
+        failures.append(f"Imported when the app starts: {', '.join(eager)}")
+    if args.max_ms is not None and median > args.max_ms:
+        failures.append(f'The median import time {median:.0f}ms is over the limit of {args.max_ms:.0f}ms')
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
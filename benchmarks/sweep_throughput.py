@@ -0,0 +1,54 @@
+## LIBRARIES
+# Util
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Run from the root of the project so the strategy modules can be imported
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importlib import import_module
+import jobs
+from sweep import expand_grid, run_sweep
+
+## FUNCTIONS
+# Random walk OHLCV data with business day dates
+def make_stock_data(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.002, bars)),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(100_000, 1_000_000, bars).astype(float)
+    }, index=pd.bdate_range('2000-01-03', periods=bars))
+
+# Measure the sweep throughput (backtests/sec) for different pool sizes
+def main():
+    parser = argparse.ArgumentParser(description='Measure the parameter sweep throughput for different pool sizes.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument('--bars', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+
+    strategy_class = import_module('modules.MovingAverageCrossover').MovingAverageCrossover
+    bt_document = {'frequency': 1, 'commission': 0.002}
+    param_combos = expand_grid({'short_period': range(5, 55, 5), 'long_period': range(60, 260, 20)})
+    stock_data = make_stock_data(args.bars)
+
+    for workers in args.workers:
+        jobs.configure_jobs(workers=workers)
+        # Warm up the worker processes before measuring
+        run_sweep(stock_data, strategy_class, bt_document, param_combos[:workers], 'Equity Final [$]')
+        sweep = run_sweep(stock_data, strategy_class, bt_document, param_combos, 'Equity Final [$]',
+                          chunk_size=args.chunk_size)
+        print(f"workers={workers:<3} backtests={sweep['evaluated']:<5} "
+              f"elapsed={sweep['elapsed']:.2f}s throughput={sweep['throughput']:.1f} backtests/sec")
+        jobs.shutdown_jobs()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+## LIBRARIES
+# Util
+import numpy as np
+import pandas as pd
+
+## CONSTANTS
+DOWNSAMPLE_METHODS = ['minmax', 'lttb']
+# Points of a chart when the request does not give the width of the viewport, and the limits of the width
+DEFAULT_CHART_WIDTH = 1000
+MIN_CHART_WIDTH = 10
+MAX_CHART_WIDTH = 10000
+# Trades returned as markers with a chart, the rest are counted but left out
+MAX_TRADE_MARKERS = 2000
+
+## FUNCTIONS
+# Positions of the points kept by a min-max decimation to about `n_points`: the lowest and highest value of every
+# bucket of consecutive points (of every series), plus the first and the last point, so no peak or trough is lost
+def downsample_minmax(values, n_points):
+    n = len(values[0])
+    if n <= n_points:
+        return np.arange(n)
+    buckets = pd.Series(np.arange(n) * max(n_points // (2 * len(values)), 1) // n)
+    keep = [np.array([0, n - 1])]
+    for series in values:
+        grouped = pd.Series(series).groupby(buckets)
+        keep += [grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy()]
+    return np.unique(np.concatenate(keep))
+
+# Positions of the points kept by the Largest-Triangle-Three-Buckets algorithm: the first and last point, and in
+# every bucket between them the point that forms the largest triangle with the previous kept point and the mean
+# of the next bucket, which keeps the visual shape of the line
+def downsample_lttb(x, y, n_points):
+    n = len(x)
+    if n <= n_points or n_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_points - 1).astype(int)
+
+    keep = np.empty(n_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(area.argmax())
+        keep[i + 1] = previous
+    return keep
+
+# Compact chart of a backtest between two dates: the equity and drawdown, downsampled to the width of the viewport,
+# and the trades in the range. Zooming in is fetching the chart again with a narrower range.
+def get_equity_chart(result, width=DEFAULT_CHART_WIDTH, start_date=None, end_date=None, method='minmax'):
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'")
+    width = int(np.clip(width, MIN_CHART_WIDTH, MAX_CHART_WIDTH))
+
+    # The drawdown is measured over the whole curve, so it does not change with the range
+    equity_curve = result['_equity_curve']
+    equity = equity_curve['Equity']
+    drawdown = equity / equity.cummax() - 1
+    in_range = np.ones(len(equity), dtype=bool)
+    if start_date:
+        in_range &= equity.index >= pd.Timestamp(start_date)
+    if end_date:
+        in_range &= equity.index <= pd.Timestamp(end_date)
+    equity, drawdown = equity[in_range], drawdown[in_range]
+
+    times = equity.index.as_unit('ms').asi8
+    if method == 'lttb':
+        keep = downsample_lttb(times, equity.to_numpy(), width)
+    else:
+        keep = downsample_minmax([equity.to_numpy(), drawdown.to_numpy()], width)
+
+    trades = result['_trades']
+    if len(equity):
+        trades = trades[(trades['ExitTime'] >= equity.index[0]) & (trades['EntryTime'] <= equity.index[-1])]
+    markers = trades.head(MAX_TRADE_MARKERS)
+    return {
+        'range': {'start': _to_millis(equity_curve.index[0]), 'end': _to_millis(equity_curve.index[-1])} if len(equity_curve) else None,
+        'points': len(keep),
+        'total_points': len(equity),
+        'time': times[keep].tolist(),
+        'equity': equity.to_numpy()[keep].round(2).tolist(),
+        'drawdown': (drawdown.to_numpy()[keep] * 100).round(4).tolist(),
+        'trades': {
+            'entry_time': [_to_millis(t) for t in markers['EntryTime']],
+            'exit_time': [_to_millis(t) for t in markers['ExitTime']],
+            'entry_price': markers['EntryPrice'].round(4).tolist(),
+            'exit_price': markers['ExitPrice'].round(4).tolist(),
+            'size': markers['Size'].astype(int).tolist(),
+            'return_pct': (markers['ReturnPct'] * 100).round(4).tolist()
+        },
+        'total_trades': len(trades)
+    }
+
+## HELPERS
+def _to_millis(timestamp):
+    return int(pd.Timestamp(timestamp).value // 1_000_000)
@@ -2,6 +2,7 @@
 from backtesting import Strategy
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Average Directional Movement (ADX) strategy is a trend-following strategy that uses the ADX indicator
@@ -37,3 +38,12 @@ class AverageDirectionalMovement(Strategy):
         else:
             # Generate a sell signal when ADX falls below the threshold
             self.sell()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        adx = np.asarray(self.adx)
+        prev_adx = np.r_[np.nan, adx[:-1]]
+        above = adx > self.adx_threshold
+        buy = above & (prev_adx < self.adx_threshold)
+        sell = ~above
+        return buy, sell
@@ -2,6 +2,7 @@
 from backtesting import Strategy
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Bollinger Bands strategy is a mean-reversion strategy that utilizes the Bollinger Bands indicator.
@@ -37,3 +38,10 @@ class BollingerBands(Strategy):
         # Sell signal: Closing price rises above or touches the upper Bollinger Band
         elif self.data.Close[-1] >= self.bollinger_high[-1]:
             self.sell()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        close = np.asarray(self.data.Close)
+        buy = close <= np.asarray(self.bollinger_low)
+        sell = ~buy & (close >= np.asarray(self.bollinger_high))
+        return buy, sell
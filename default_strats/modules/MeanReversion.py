@@ -2,6 +2,7 @@
 from backtesting import Strategy
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Mean Reversion strategy is a popular mean-reversion trading strategy that identifies potential
@@ -39,3 +40,11 @@ class MeanReversion(Strategy):
         # Buy signal: Z-score falls below the negative threshold
         elif z_score < -self.z_score_threshold:
             self.buy()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = (np.asarray(self.data.Close) - np.asarray(self.mean)) / np.asarray(self.std)
+        sell = z_score > self.z_score_threshold
+        buy = ~sell & (z_score < -self.z_score_threshold)
+        return buy, sell
@@ -2,6 +2,7 @@
 from backtesting import Strategy
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
     # Strategy Description:
         # The Mean Reversion Bollinger strategy is a mean-reversion strategy that combines the concepts of mean reversion
@@ -44,4 +45,11 @@ class MeanReversionBollinger(Strategy):
 
         # Buy signal: Closing price falls below the lower band
         elif self.data.Close[-1] < self.lower_band[-1]:
-            self.buy()
\ No newline at end of file
+            self.buy()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        close = np.asarray(self.data.Close)
+        sell = close > np.asarray(self.upper_band)
+        buy = ~sell & (close < np.asarray(self.lower_band))
+        return buy, sell
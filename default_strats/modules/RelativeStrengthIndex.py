@@ -2,6 +2,7 @@
 from backtesting import Strategy
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Relative Strength Index (RSI) strategy is a momentum-based strategy that uses the RSI indicator to generate
@@ -40,3 +41,10 @@ class RelativeStrengthIndex(Strategy):
         # Buy signal: RSI value falls below the buy threshold (oversold)
         elif self.rsi[-1] < self.buy_threshold:
             self.buy()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        rsi = np.asarray(self.rsi)
+        sell = rsi > self.sell_threshold
+        buy = ~sell & (rsi < self.buy_threshold)
+        return buy, sell
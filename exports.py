@@ -0,0 +1,107 @@
+## LIBRARIES
+# Util
+import importlib.util
+import zipfile
+from io import BytesIO, StringIO
+
+import pandas as pd
+
+## CONSTANTS
+EXPORT_FORMATS = ['xlsx', 'csv', 'parquet']
+# Tables of a backtest that can be exported, the sheets of the Excel file
+EXPORT_TABLES = {'stats': 'Statistics', 'trades': 'Trades', 'equity': 'Equity'}
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'zip': 'application/zip'
+}
+# Rows of every chunk of a streamed CSV file
+CSV_CHUNK_ROWS = 5000
+# Bytes of every chunk of a streamed buffer
+STREAM_CHUNK_BYTES = 64 * 1024
+
+## FUNCTIONS
+# Tables of the results of a backtest: its statistics, its trades and its equity curve
+def get_export_tables(result):
+    stats = result[:-2].rename('Value').to_frame()
+    stats.index.name = 'Statistic'
+    return {'stats': stats, 'trades': result['_trades'], 'equity': result['_equity_curve']}
+
+# Export some tables of the results of a backtest in a format, built in a buffer of the request.
+# Returns the chunks of the file, its mimetype and its name. The tables of a CSV or Parquet export
+# are sent in a ZIP file when there are several.
+def export_results(result, name, fmt='xlsx', tables=None):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    tables = tables or list(EXPORT_TABLES)
+    unknown_tables = [table for table in tables if table not in EXPORT_TABLES]
+    if unknown_tables:
+        raise ValueError(f"Unknown tables: {', '.join(unknown_tables)}")
+    if fmt == 'parquet' and not (importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet')):
+        raise ValueError('The Parquet export needs pyarrow or fastparquet to be installed')
+    data = {table: df for table, df in get_export_tables(result).items() if table in tables}
+
+    if fmt == 'xlsx':
+        return stream_buffer(write_excel(data)), EXPORT_MIMETYPES['xlsx'], f'{name}.xlsx'
+    if len(data) == 1:
+        table, df = next(iter(data.items()))
+        chunks = iter_csv(df) if fmt == 'csv' else stream_buffer(write_parquet(table, df))
+        return chunks, EXPORT_MIMETYPES[fmt], f'{name}_{table}.{fmt}'
+    return stream_buffer(write_zip(data, fmt)), EXPORT_MIMETYPES['zip'], f'{name}_{fmt}.zip'
+
+# Excel file with a sheet per table
+def write_excel(data):
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as excel_writer:
+        for table, df in data.items():
+            _excel_frame(table, df).to_excel(excel_writer, sheet_name=EXPORT_TABLES[table])
+    buffer.seek(0)
+    return buffer
+
+def write_parquet(table, df):
+    buffer = BytesIO()
+    _parquet_frame(table, df).to_parquet(buffer)
+    buffer.seek(0)
+    return buffer
+
+# ZIP file with a CSV or Parquet file per table
+def write_zip(data, fmt):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for table, df in data.items():
+            if fmt == 'csv':
+                archive.writestr(f'{table}.csv', df.to_csv())
+            else:
+                archive.writestr(f'{table}.parquet', write_parquet(table, df).getvalue())
+    buffer.seek(0)
+    return buffer
+
+# Chunks of a CSV file, written a few rows at a time so large tables are not held as a single string
+def iter_csv(df, chunk_rows=CSV_CHUNK_ROWS):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = StringIO()
+        df.iloc[start:start + chunk_rows].to_csv(chunk, header=start == 0)
+        yield chunk.getvalue()
+
+def stream_buffer(buffer, chunk_bytes=STREAM_CHUNK_BYTES):
+    while True:
+        chunk = buffer.read(chunk_bytes)
+        if not chunk:
+            break
+        yield chunk
+
+## HELPERS
+# Excel has no durations, they are written as text
+def _excel_frame(table, df):
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_timedelta64_dtype(df[column]):
+            df[column] = df[column].astype(str)
+    if table == 'stats':
+        df['Value'] = [str(value) if isinstance(value, pd.Timedelta) else value for value in df['Value']]
+    return df
+
+# Parquet columns have a single type, the mixed values of the statistics are written as text
+def _parquet_frame(table, df):
+    return df.astype(str) if table == 'stats' else df
@@ -0,0 +1,115 @@
+## LIBRARIES
+# Util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+## CONSTANTS
+# Seconds a company overview is fresh, and seconds it is still returned while it is refreshed in the background.
+# Tickers the API does not know are cached for less time, in case they are listed later.
+FUNDAMENTALS_TTL = 24 * 3600
+FUNDAMENTALS_STALE_TTL = 30 * 24 * 3600
+MISSING_TTL = 6 * 3600
+# Background refreshes made at the same time, few to stay within the rate limit of the API
+REFRESH_WORKERS = 1
+
+## STATE
+# Collections with the index of the tickers, created with the first write so the app does not wait for the
+# database when it starts
+_indexed_collections = set()
+# Tickers being refreshed in the background, so a ticker is only queued once
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_refresh_pool = None
+
+## CONFIGURATION
+def configure_fundamentals(ttl=None, stale_ttl=None, missing_ttl=None):
+    global FUNDAMENTALS_TTL, FUNDAMENTALS_STALE_TTL, MISSING_TTL
+    if ttl:
+        FUNDAMENTALS_TTL = int(ttl)
+    if stale_ttl:
+        FUNDAMENTALS_STALE_TTL = int(stale_ttl)
+    if missing_ttl:
+        MISSING_TTL = int(missing_ttl)
+
+def get_refresh_pool():
+    global _refresh_pool
+    with _refreshing_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='fundamentals')
+        return _refresh_pool
+
+## FUNCTIONS
+# Company overview of a ticker from the collection. A fresh one is returned without calling the API, a stale one
+# is returned and refreshed in the background, and a missing or too old one is fetched before returning.
+# `fetch(ticker)` returns the overview, empty if the API does not know the ticker. Returns the overview and
+# its state: 'fresh', 'stale' or 'fetched'.
+def get_overview(collection, ticker, fetch):
+    document = collection.find_one({'ticker': ticker}, {'_id': 0})
+    now = datetime.now(timezone.utc)
+    if document is not None:
+        if _as_utc(document['expires_at']) > now:
+            return document['data'], 'fresh'
+        if _as_utc(document['fetched_at']) + timedelta(seconds=FUNDAMENTALS_STALE_TTL) > now:
+            schedule_refresh(collection, ticker, fetch)
+            return document['data'], 'stale'
+    return refresh_overview(collection, ticker, fetch), 'fetched'
+
+# Fetch the overview of a ticker and store it with the time it expires
+def refresh_overview(collection, ticker, fetch):
+    data = fetch(ticker) or {}
+    _ensure_index(collection)
+    now = datetime.now(timezone.utc)
+    ttl = FUNDAMENTALS_TTL if data else MISSING_TTL
+    collection.update_one(
+        {'ticker': ticker},
+        {'$set': {'ticker': ticker, 'data': data, 'fetched_at': now, 'expires_at': now + timedelta(seconds=ttl)}},
+        upsert=True
+    )
+    return data
+
+# Refresh the overview of a ticker in the background, unless it is already queued
+def schedule_refresh(collection, ticker, fetch):
+    with _refreshing_lock:
+        if ticker in _refreshing:
+            return False
+        _refreshing.add(ticker)
+    get_refresh_pool().submit(_refresh_task, collection, ticker, fetch)
+    return True
+
+# Queue the refresh of the overviews of a watch list that are missing or expired. Returns the number of
+# tickers queued and of tickers that are still fresh.
+def prefetch_overviews(collection, tickers, fetch):
+    fresh = {document['ticker'] for document in collection.find(
+        {'ticker': {'$in': list(tickers)}, 'expires_at': {'$gt': datetime.now(timezone.utc)}}, {'ticker': 1})}
+    queued = sum(schedule_refresh(collection, ticker, fetch) for ticker in dict.fromkeys(tickers) if ticker not in fresh)
+    return {'queued': queued, 'fresh': len(fresh)}
+
+def get_fundamentals_stats(collection):
+    now = datetime.now(timezone.utc)
+    with _refreshing_lock:
+        refreshing = len(_refreshing)
+    return {
+        'entries': collection.count_documents({}),
+        'expired': collection.count_documents({'expires_at': {'$lte': now}}),
+        'refreshing': refreshing
+    }
+
+## HELPERS
+# MongoDB returns the dates without time zone unless the client is tz_aware, they are stored in UTC
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def _ensure_index(collection):
+    if collection.full_name not in _indexed_collections:
+        collection.create_index('ticker', unique=True)
+        _indexed_collections.add(collection.full_name)
+
+def _refresh_task(collection, ticker, fetch):
+    try:
+        refresh_overview(collection, ticker, fetch)
+    except Exception as e:
+        print(f"Error refreshing the overview of '{ticker}': {str(e)}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(ticker)
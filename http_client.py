@@ -0,0 +1,151 @@
+## LIBRARIES
+# Util
+import os
+import time
+import threading
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+## CONSTANTS
+ALPHAVANTAGE_URL = 'https://www.alphavantage.co/query'
+# Seconds to connect and to wait for the response of an upstream server
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 30
+# Keep-alive connections kept open to every host
+POOL_SIZE = 20
+# Retries of the requests that could not connect, the rest are not retried because they may have been processed
+CONNECT_RETRIES = 2
+# Seconds an API key is not used after the API answers that it reached its limit
+KEY_COOLDOWN = 60
+
+## STATE
+# Session of the process, with its pool of keep-alive connections. Worker processes create their own.
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+# Upstream calls in flight by their request, the identical requests made meanwhile wait for the same result
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+# AlphaVantage keys used in turns, and the time until which every key is resting
+_api_keys = []
+_next_key = 0
+_key_resting_until = {}
+_keys_lock = threading.Lock()
+
+## CONFIGURATION
+def configure_http_client(api_keys=None, connect_timeout=None, read_timeout=None, pool_size=None):
+    global _api_keys, CONNECT_TIMEOUT, READ_TIMEOUT, POOL_SIZE, _session
+    if api_keys:
+        with _keys_lock:
+            _api_keys = list(dict.fromkeys(key for key in api_keys if key))
+    if connect_timeout:
+        CONNECT_TIMEOUT = float(connect_timeout)
+    if read_timeout:
+        READ_TIMEOUT = float(read_timeout)
+    if pool_size:
+        POOL_SIZE = int(pool_size)
+        with _session_lock:
+            _session = None
+
+def get_session():
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE,
+                                  max_retries=Retry(total=None, connect=CONNECT_RETRIES, read=False, status=0, other=0,
+                                                    backoff_factor=0.2))
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session_pid = os.getpid()
+        return _session
+
+## FUNCTIONS
+# JSON response of a GET request through the pooled session. Identical requests in flight share a single upstream
+# call, so the result is shared too and must not be modified. Raises requests.RequestException on network errors,
+# timeouts and error statuses.
+def get_json(url, params=None, timeout=None):
+    key = (url, tuple(sorted((params or {}).items())))
+    return _coalesce(key, lambda: _get_json(url, params, timeout))
+
+# Query of the AlphaVantage API with the given key, or with the configured keys in turns. A key the API answers
+# is over its limit rests for a while and the query is made again with the next one. Raises ValueError with
+# the message of the API when it answers an error, like the alpha_vantage library.
+def alphavantage_query(params, api_key=None):
+    key = ('alphavantage', tuple(sorted(params.items())), api_key)
+    return _coalesce(key, lambda: _alphavantage_query(params, api_key))
+
+# Whether a message of the AlphaVantage API says that a key reached its limit
+def is_rate_limit(message):
+    message = str(message).lower()
+    return any(text in message for text in ('rate limit', 'call frequency', 'premium', 'thank you for using alpha vantage'))
+
+# Number of upstream calls in flight, for the monitoring of the app
+def get_http_client_stats():
+    with _in_flight_lock:
+        in_flight = len(_in_flight)
+    with _keys_lock:
+        now = time.monotonic()
+        resting = sum(until > now for until in _key_resting_until.values())
+    return {'in_flight': in_flight, 'api_keys': len(_api_keys), 'resting_keys': resting, 'pool_size': POOL_SIZE}
+
+## HELPERS
+def _get_json(url, params, timeout):
+    response = get_session().get(url, params=params, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT))
+    response.raise_for_status()
+    return response.json()
+
+def _alphavantage_query(params, api_key):
+    attempts = 1 if api_key else max(len(_api_keys), 1)
+    for _ in range(attempts):
+        key = api_key or _take_key()
+        data = _get_json(ALPHAVANTAGE_URL, {**params, 'apikey': key}, None)
+        message = data.get('Error Message') or data.get('Information') or data.get('Note') if isinstance(data, dict) else None
+        if not message:
+            return data
+        if 'Error Message' in data or not is_rate_limit(message):
+            raise ValueError(message)
+        _rest_key(key)
+    raise ValueError(message)
+
+# Next key that is not resting, or the one that finishes resting first
+def _take_key():
+    global _next_key
+    with _keys_lock:
+        if not _api_keys:
+            raise ValueError('There are no AlphaVantage API keys configured')
+        now = time.monotonic()
+        order = [_api_keys[(_next_key + i) % len(_api_keys)] for i in range(len(_api_keys))]
+        key = next((key for key in order if _key_resting_until.get(key, 0) <= now),
+                   min(order, key=lambda key: _key_resting_until.get(key, 0)))
+        _next_key = (_api_keys.index(key) + 1) % len(_api_keys)
+        return key
+
+def _rest_key(key):
+    with _keys_lock:
+        _key_resting_until[key] = time.monotonic() + KEY_COOLDOWN
+
+# Run a call unless an identical one is in flight, in which case wait for its result
+def _coalesce(key, call):
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = Future()
+    if not owner:
+        return future.result()
+
+    try:
+        result = call()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
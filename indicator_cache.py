@@ -0,0 +1,125 @@
+## LIBRARIES
+# Util
+import copyreg
+import hashlib
+import inspect
+import sys
+from numbers import Number
+
+import numpy as np
+
+# Cache
+from bytes_cache import BytesLRUCache
+from strategy_registry import RegisteredStrategyType
+
+## CONSTANTS
+# Memory budget of the indicators kept by every process
+INDICATOR_CACHE_BYTES = 256 * 1024 * 1024
+
+## CACHE
+_cache = BytesLRUCache(INDICATOR_CACHE_BYTES)
+
+# Change the memory budget of the cache of this process
+def configure_indicator_cache(max_bytes=None):
+    global INDICATOR_CACHE_BYTES
+    if max_bytes:
+        INDICATOR_CACHE_BYTES = int(max_bytes)
+        _cache.resize(INDICATOR_CACHE_BYTES)
+
+def get_indicator_cache():
+    return _cache
+
+def get_indicator_cache_stats():
+    return _cache.stats()
+
+## FUNCTIONS
+# Key of the price data of a backtest: ticker, date range, frequency and a digest of the prices,
+# so refreshed or adjusted prices never reuse old indicators
+def get_data_key(data, bt_document):
+    digest = hashlib.blake2b(np.ascontiguousarray(data.to_numpy(dtype='float64')).tobytes(), digest_size=16).hexdigest()
+    first_date = str(data.index[0]) if len(data) else None
+    last_date = str(data.index[-1]) if len(data) else None
+    return (bt_document.get('ticker'), first_date, last_date, len(data), str(bt_document.get('frequency')), digest)
+
+# Subclass of a strategy whose indicators declared with self.I() are looked up in the cache.
+# The subclass keeps the name of the strategy, so the results and plots do not change.
+def cached_strategy(strategy_class, data_key):
+    def I(self, func, *args, name=None, plot=True, overlay=None, color=None, scatter=False, **kwargs):
+        key = _indicator_key(self, data_key, func, args, kwargs)
+        if key is None:
+            return strategy_class.I(self, func, *args, name=name, plot=plot, overlay=overlay, color=color, scatter=scatter, **kwargs)
+
+        def cached_func(*args, **kwargs):
+            value = _cache.get(key)
+            if value is None:
+                value = func(*args, **kwargs)
+                frozen = _freeze(value)
+                if frozen is None:
+                    return value
+                _cache.put(key, frozen, _value_bytes(frozen))
+                value = frozen
+            return value
+        cached_func.__name__ = getattr(func, '__name__', func.__class__.__name__)
+
+        return strategy_class.I(self, cached_func, *args, name=name, plot=plot, overlay=overlay, color=color, scatter=scatter, **kwargs)
+
+    return _CachedStrategyType(strategy_class.__name__, (strategy_class,), {
+        'I': I,
+        '_indicator_data_key': data_key,
+        '__module__': strategy_class.__module__,
+        '__qualname__': strategy_class.__qualname__
+    })
+
+# The cached subclasses are not importable, they are pickled as the arguments that build them again.
+# The metaclass derives from the one of the registered strategies (itself derived from ABCMeta, the metaclass of
+# Strategy), so it can subclass them; backtesting is not imported until a strategy is.
+class _CachedStrategyType(RegisteredStrategyType):
+    pass
+
+copyreg.pickle(_CachedStrategyType, lambda cls: (cached_strategy, (cls.__bases__[0], cls._indicator_data_key)))
+
+## HELPERS
+# Hashable key of an indicator call, None if the function or one of its arguments cannot be identified
+# (lambdas, local functions and methods may depend on the parameters of the strategy)
+def _indicator_key(strategy, data_key, func, args, kwargs):
+    # Functions of the strategy modules are identified by the version of their module too
+    module_name = getattr(func, '__module__', None)
+    module_version = getattr(sys.modules.get(module_name), '__strategy_digest__', None) if module_name else None
+    func_key = (module_name, getattr(func, '__qualname__', None), module_version)
+    if func_key[1] is None or '<' in func_key[1] or inspect.ismethod(func):
+        return None
+    try:
+        args_key = tuple(_arg_key(strategy, arg) for arg in args)
+        kwargs_key = tuple(sorted((k, _arg_key(strategy, v)) for k, v in kwargs.items()))
+    except TypeError:
+        return None
+    return (data_key, func_key, args_key, kwargs_key)
+
+# Price columns are identified by name, other arrays by their content
+def _arg_key(strategy, arg):
+    from backtesting._util import _Array
+
+    if arg is None or isinstance(arg, (Number, str)):
+        return arg
+    if isinstance(arg, _Array) and arg.name in ('Open', 'High', 'Low', 'Close', 'Volume') \
+            and getattr(strategy.data, arg.name, None) is arg:
+        return ('data', arg.name)
+    if isinstance(arg, np.ndarray) and arg.dtype != object:
+        arg = np.ascontiguousarray(arg)
+        return ('array', arg.dtype.str, arg.shape, hashlib.blake2b(arg.tobytes(), digest_size=16).hexdigest())
+    raise TypeError(f'Unsupported indicator argument {type(arg)}')
+
+# Cached values are shared between backtests, so they are made read-only
+def _freeze(value):
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        value = value.view(np.ndarray)
+        value.flags.writeable = False
+        return value
+    if isinstance(value, tuple) and value and all(isinstance(v, np.ndarray) for v in value):
+        return tuple(_freeze(v) for v in value)
+    return None
+
+def _value_bytes(value):
+    if isinstance(value, tuple):
+        return sum(v.nbytes for v in value)
+    return value.nbytes
@@ -0,0 +1,281 @@
+## LIBRARIES
+# Util
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+
+from http_client import ALPHAVANTAGE_URL, CONNECT_TIMEOUT, READ_TIMEOUT, get_session, is_rate_limit
+from ticker_index import LISTING_FILE
+
+# Price store
+from price_store import INTRADAY_INTERVALS, configure_price_store, is_valid_ticker
+from stock_updater import fetch_stock_data, fetch_intraday_data, refresh_stock_data, refresh_intraday_data
+
+## CONSTANTS
+# Requests per minute allowed by every API key, and the requests a key can make at once after being idle
+REQUESTS_PER_MINUTE = 5
+BURST_REQUESTS = 1
+# Attempts of a ticker before it is recorded as failed, and the first wait between them (doubled every time)
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 2
+MAX_BACKOFF_SECONDS = 300
+# Seconds a key is left unused after the API answers that its limit was reached
+RATE_LIMIT_COOLDOWN = 60
+CHECKPOINT_FILE = 'ingest_checkpoint.json'
+
+## RATE LIMIT
+# Token bucket of an API key: it holds up to `capacity` requests and gets `rate` new ones every second
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+
+    # Take a request if there is one, otherwise return the seconds until the next one
+    def try_acquire(self, now):
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    # Leave the bucket empty for some seconds
+    def block(self, seconds, now):
+        self.tokens = 0
+        self.updated = now + seconds
+        self.blocked_until = now + seconds
+
+# Token buckets of all the API keys. The keys are tried in turns, so the downloads are spread across them and
+# none of them goes over its limit.
+class KeyPool:
+    def __init__(self, keys, requests_per_minute=REQUESTS_PER_MINUTE, burst=BURST_REQUESTS):
+        if not keys:
+            raise ValueError('There are no API keys')
+        self.keys = list(keys)
+        self.buckets = {key: TokenBucket(requests_per_minute / 60, burst) for key in self.keys}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    # Wait for a free request and return the key to make it with
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                waits = []
+                for i in range(len(self.keys)):
+                    key = self.keys[(self._next + i) % len(self.keys)]
+                    wait = self.buckets[key].try_acquire(now)
+                    if wait == 0:
+                        self._next = (self._next + i + 1) % len(self.keys)
+                        return key
+                    waits.append(wait)
+            time.sleep(min(waits))
+
+    # The API answered that a key reached its limit
+    def block(self, key, seconds=RATE_LIMIT_COOLDOWN):
+        with self._lock:
+            self.buckets[key].block(seconds, time.monotonic())
+
+## FUNCTIONS
+# API keys of static/tokens.json, every value whose name starts with ALPHAVANTAGE_KEY
+def load_api_keys(path='static/tokens.json'):
+    with open(path) as file:
+        keys_data = json.load(file)
+    keys = [value for name, value in sorted(keys_data.items()) if name.startswith('ALPHAVANTAGE_KEY') and value]
+    return list(dict.fromkeys(keys))
+
+# Tickers given in the command line, in files with a ticker per line and in named universes
+def load_tickers(tickers=(), files=(), universes=(), universes_path='static/universes.json'):
+    names = list(tickers)
+    for path in files:
+        with open(path) as file:
+            names += [line.split('#')[0] for line in file]
+    if universes:
+        with open(universes_path) as file:
+            universe_tickers = json.load(file)
+        for universe in universes:
+            if universe not in universe_tickers:
+                raise ValueError(f"Unknown universe '{universe}'")
+            names += universe_tickers[universe]
+
+    names = [name.strip().upper() for name in names if name.strip()]
+    invalid = [name for name in names if not is_valid_ticker(name)]
+    if invalid:
+        raise ValueError(f"Invalid tickers: {', '.join(invalid)}")
+    return list(dict.fromkeys(names))
+
+# Tickers already ingested and the ones that failed, from the checkpoint of a previous run with the same end date
+# and interval. A run for another date starts over.
+def load_checkpoint(path, end_date, interval=None):
+    empty = {'end_date': end_date, 'interval': interval, 'done': {}, 'failed': {}}
+    if not os.path.exists(path):
+        return empty
+    with open(path) as file:
+        checkpoint = json.load(file)
+    if checkpoint.get('end_date') != end_date or checkpoint.get('interval') != interval:
+        return empty
+    return {**empty, 'done': checkpoint.get('done', {}), 'failed': checkpoint.get('failed', {})}
+
+# Write the checkpoint to a temporary file and rename it, so an interrupted run never leaves a partial file
+def save_checkpoint(path, checkpoint):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(checkpoint, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# Download the LISTING_STATUS file of AlphaVantage, the active symbols and their names searched by the autocomplete
+# of the app. The file is replaced only when the download succeeds. Returns the number of symbols.
+def download_listing(path, api_key):
+    response = get_session().get(ALPHAVANTAGE_URL, params={'function': 'LISTING_STATUS', 'apikey': api_key},
+                                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    response.raise_for_status()
+    text = response.text
+    if not text.startswith('symbol,'):
+        raise ValueError(f'Unexpected answer of the API: {text[:200]}')
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(text.strip().splitlines()) - 1
+
+# Download a ticker into the price store, with a request of the key pool for every call to the API.
+# Errors of the network and the rate limit of the API are retried with exponential backoff and jitter;
+# unknown tickers fail at once. Returns 'cached', 'appended' or 'reloaded'.
+def ingest_ticker(ticker, key_pool, end_date, interval=None, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_SECONDS):
+    if max_attempts < 1:
+        raise ValueError(f'max_attempts must be at least 1, got {max_attempts}')
+    used_keys = []
+
+    def fetch(ticker, _, *args):
+        key = key_pool.acquire()
+        used_keys.append(key)
+        return (fetch_intraday_data if interval else fetch_stock_data)(ticker, key, *args)
+
+    for attempt in range(max_attempts):
+        try:
+            if interval:
+                return refresh_intraday_data(ticker, interval, end_date, None, fetch=fetch)
+            return refresh_stock_data(ticker, end_date, None, fetch=fetch)
+        except ValueError as e:
+            if _is_unknown_ticker(e):
+                raise
+            if used_keys and is_rate_limit(e):
+                key_pool.block(used_keys[-1])
+            error = e
+        except (requests.RequestException, OSError) as e:
+            error = e
+        if attempt + 1 < max_attempts:
+            time.sleep(min(backoff * 2 ** attempt, MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.5))
+    raise error
+
+# Download many tickers concurrently, saving the checkpoint after every ticker. The tickers of the checkpoint are
+# skipped, and the ones that failed are only tried again with `retry_failed`.
+def run_ingestion(tickers, key_pool, end_date, checkpoint_path=CHECKPOINT_FILE, interval=None, workers=None,
+                  retry_failed=False, max_attempts=MAX_ATTEMPTS):
+    checkpoint = load_checkpoint(checkpoint_path, end_date, interval)
+    skipped = set(checkpoint['done']) | (set() if retry_failed else set(checkpoint['failed']))
+    pending = [ticker for ticker in tickers if ticker not in skipped]
+    print(f"{len(pending)} tickers to ingest, {len(tickers) - len(pending)} in the checkpoint")
+
+    workers = workers or 2 * len(key_pool.keys)
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(ingest_ticker, ticker, key_pool, end_date, interval, max_attempts): ticker
+                   for ticker in pending}
+        try:
+            for i, future in enumerate(as_completed(futures), start=1):
+                ticker = futures[future]
+                try:
+                    status = future.result()
+                    checkpoint['failed'].pop(ticker, None)
+                    checkpoint['done'][ticker] = status
+                except Exception as e:
+                    status = f'failed ({e})'
+                    checkpoint['failed'][ticker] = str(e)
+                save_checkpoint(checkpoint_path, checkpoint)
+                print(f"[{i}/{len(pending)}] {ticker}: {status}")
+        except KeyboardInterrupt:
+            print('Interrupted, the checkpoint keeps the tickers ingested so far')
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    elapsed = time.perf_counter() - start_time
+    failed = [ticker for ticker in pending if ticker in checkpoint['failed']]
+    print(f"Ingested {len(pending) - len(failed)} tickers in {elapsed:.1f}s, {len(failed)} failed")
+    return checkpoint
+
+# Pre-load the price store with the series of many tickers, e.g.
+#   python ingest_prices.py --universe SP500 --checkpoint sp500.json
+def main():
+    parser = argparse.ArgumentParser(description='Download the price series of many tickers into the price store.')
+    parser.add_argument('tickers', nargs='*', help='Tickers to download')
+    parser.add_argument('--file', action='append', default=[], help='File with a ticker per line')
+    parser.add_argument('--universe', action='append', default=[], help='Universe of static/universes.json')
+    parser.add_argument('--end-date', default=pd.Timestamp.today().strftime('%Y-%m-%d'),
+                        help='Date the series must reach, today by default')
+    parser.add_argument('--interval', choices=INTRADAY_INTERVALS, help='Download the intraday bars of an interval')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    parser.add_argument('--retry-failed', action='store_true', help='Try again the tickers that failed before')
+    parser.add_argument('--requests-per-minute', type=float, default=REQUESTS_PER_MINUTE, help='Limit of every key')
+    parser.add_argument('--burst', type=int, default=BURST_REQUESTS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+    parser.add_argument('--tokens', default='static/tokens.json')
+    parser.add_argument('--config', default='static/config.json')
+    parser.add_argument('--listing', nargs='?', const=LISTING_FILE, default=None, metavar='PATH',
+                        help=f'Download the listing of symbols searched by the app (to {LISTING_FILE} by default)')
+    args = parser.parse_args()
+    if args.max_attempts < 1:
+        parser.error('--max-attempts must be at least 1')
+
+    # The same price store as the app
+    if os.path.exists(args.config):
+        with open(args.config) as file:
+            config_data = json.load(file)
+        configure_price_store(config_data.get('PRICE_STORE_DIR'))
+
+    if args.listing:
+        api_keys = load_api_keys(args.tokens)
+        if not api_keys:
+            parser.error(f'No AlphaVantage API keys in {args.tokens}')
+        count = download_listing(args.listing, api_keys[0])
+        print(f'Listing of {count} symbols saved to {args.listing}')
+
+    tickers = load_tickers(args.tickers, args.file, args.universe)
+    if not tickers:
+        if args.listing:
+            return
+        parser.error('No tickers to download')
+    key_pool = KeyPool(load_api_keys(args.tokens), args.requests_per_minute, args.burst)
+    run_ingestion(tickers, key_pool, args.end_date, args.checkpoint, args.interval, args.workers, args.retry_failed,
+                  args.max_attempts)
+
+## HELPERS
+# Message of the AlphaVantage API for unknown symbols
+def _is_unknown_ticker(error):
+    return 'Invalid API call' in str(error)
+
+if __name__ == '__main__':
+    main()
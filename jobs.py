@@ -0,0 +1,201 @@
+## LIBRARIES
+# Util
+import os
+import time
+import threading
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+
+## CONSTANTS
+# Number of worker processes that run the backtests
+JOB_WORKERS = os.cpu_count() or 1
+# Number of jobs that can be driven at the same time, the rest wait in the queue
+JOB_DRIVERS = 4
+# Seconds a finished job is kept so its status can still be polled
+JOB_RETENTION = 3600
+# Seconds between checks of the job cancellation while waiting for its tasks
+CANCEL_POLL_INTERVAL = 0.5
+
+## JOB STATE
+# Raised inside a job driver when the job has been cancelled
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind, username):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.username = username
+        self.status = 'queued'
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    # Set the number of work units of the job (e.g. parameter combinations)
+    def set_total(self, total):
+        self.total = total
+
+    # Mark some work units as completed
+    def advance(self, count=1):
+        with self._lock:
+            self.done += count
+
+    # Stop the driver if the job has been cancelled
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    # Send a task to the worker processes on behalf of this job
+    def submit(self, fn, *args):
+        self.check_cancelled()
+        future = get_process_pool().submit(fn, *args)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard_future)
+        return future
+
+    # Yield the tasks of the job as they complete, stopping if the job is cancelled
+    def iter_completed(self, futures):
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            self.check_cancelled()
+            yield from done
+
+    def _discard_future(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    # Request the cancellation of the job and drop its pending tasks
+    def cancel(self):
+        self._cancel_event.set()
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+    # Summary of the job state, with the estimated remaining time
+    def to_dict(self, include_result=False):
+        now = self.finished_at or time.time()
+        elapsed = now - self.started_at if self.started_at else 0
+        eta = None
+        if self.status == 'running' and self.done > 0 and self.total:
+            eta = elapsed / self.done * (self.total - self.done)
+        job_info = {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'done': self.done,
+            'total': self.total,
+            'elapsed': round(elapsed, 3),
+            'eta': round(eta, 3) if eta is not None else None
+        }
+        if self.error is not None:
+            job_info['error'] = self.error
+        if include_result and self.status == 'done':
+            job_info['result'] = self.result
+        return job_info
+
+## POOLS
+_process_pool = None
+_worker_initializer = None
+_driver_pool = None
+_pools_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# Change the size of the pools, must be called before the first job is submitted.
+# `worker_initializer` is a (function, args) pair run once in every new worker process.
+def configure_jobs(workers=None, drivers=None, worker_initializer=None):
+    global JOB_WORKERS, JOB_DRIVERS, _worker_initializer
+    if workers:
+        JOB_WORKERS = int(workers)
+    if drivers:
+        JOB_DRIVERS = int(drivers)
+    if worker_initializer:
+        _worker_initializer = worker_initializer
+
+# Worker processes are spawned so they do not inherit the database connections of the server
+def get_process_pool():
+    global _process_pool
+    with _pools_lock:
+        if _process_pool is None:
+            initializer, initargs = _worker_initializer or (None, ())
+            _process_pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=initializer, initargs=initargs)
+        return _process_pool
+
+def get_driver_pool():
+    global _driver_pool
+    with _pools_lock:
+        if _driver_pool is None:
+            _driver_pool = ThreadPoolExecutor(max_workers=JOB_DRIVERS, thread_name_prefix='job-driver')
+        return _driver_pool
+
+# Stop the pools, they are created again with the current configuration on the next job
+def shutdown_jobs(wait=True):
+    global _process_pool, _driver_pool
+    with _pools_lock:
+        for pool in (_driver_pool, _process_pool):
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+        _process_pool = None
+        _driver_pool = None
+
+## FUNCTIONS
+# Register a job and queue its driver, returning the job id right away
+def submit_job(kind, username, driver, *args):
+    prune_jobs()
+    job = Job(kind, username)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+    get_driver_pool().submit(_run_job, job, driver, args)
+    return job.job_id
+
+# Run the driver of a job in a driver thread and record its outcome
+def _run_job(job, driver, args):
+    if job._cancel_event.is_set():
+        job.status = 'cancelled'
+        job.finished_at = time.time()
+        return
+    job.status = 'running'
+    job.started_at = time.time()
+    try:
+        job.result = driver(job, *args)
+        job.status = 'done'
+    except (JobCancelled, CancelledError):
+        job.status = 'cancelled'
+    except Exception as e:
+        print(f"Error in {job.kind} job '{job.job_id}': {str(e)}")
+        job.error = str(e)
+        job.status = 'failed'
+    finally:
+        job.finished_at = time.time()
+
+# Get a job by its id
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+# Cancel a job, returns False if it already finished
+def cancel_job(job_id):
+    job = get_job(job_id)
+    if job is None or job.status in ('done', 'failed', 'cancelled'):
+        return False
+    job.cancel()
+    return True
+
+# Forget the jobs that finished more than JOB_RETENTION seconds ago
+def prune_jobs():
+    limit = time.time() - JOB_RETENTION
+    with _jobs_lock:
+        for job_id in [job_id for job_id, job in _jobs.items() if job.finished_at and job.finished_at < limit]:
+            del _jobs[job_id]
@@ -0,0 +1,25 @@
+## LIBRARIES
+# Util
+import math
+
+import numpy as np
+import pandas as pd
+
+## FUNCTIONS
+# Plain Python value of a statistic for the JSON responses, NaN becomes None
+def to_json_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, (np.integer, int)):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return None if math.isnan(value) else float(value)
+    return str(value)
+
+# Float of a statistic, None when it is missing or NaN
+def to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
@@ -2,6 +2,7 @@
 from backtesting import Strategy
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Momentum Volatility strategy is a trend-following strategy that combines momentum and volatility indicators.
@@ -46,3 +47,11 @@ class MomentumVolatility(Strategy):
         # Buy signal: Momentum is negative and ATR surpasses the threshold
         elif self.returns[-1] < 0 and self.atr[-1] > self.atr_threshold:
             self.buy()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        returns, atr = np.asarray(self.returns), np.asarray(self.atr)
+        volatile = atr > self.atr_threshold
+        sell = (returns > 0) & volatile
+        buy = ~sell & (returns < 0) & volatile
+        return buy, sell
@@ -3,6 +3,7 @@ from backtesting import Strategy
 from backtesting.lib import crossover
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Moving Average Convergence Divergence (MACD) strategy is a trend-following strategy that utilizes the MACD
@@ -40,3 +41,11 @@ class MovingAverageConvergenceDivergence(Strategy):
         # Sell signal: MACD histogram crosses below zero line
         elif crossover(0, self.macd_hist):
             self.sell()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        macd_hist = np.asarray(self.macd_hist)
+        prev_macd_hist = np.r_[np.nan, macd_hist[:-1]]
+        buy = (prev_macd_hist < 0) & (macd_hist > 0)
+        sell = ~buy & (prev_macd_hist > 0) & (macd_hist < 0)
+        return buy, sell
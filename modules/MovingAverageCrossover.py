@@ -3,6 +3,7 @@ from backtesting import Strategy
 from backtesting.lib import crossover
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Moving Average Crossover strategy is a trend-following strategy that generates buy and sell signals based on
@@ -37,3 +38,11 @@ class MovingAverageCrossover(Strategy):
         # Sell signal: Short-term moving average crosses below long-term moving average
         elif crossover(self.long_ma, self.short_ma):
             self.sell()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        short_ma, long_ma = np.asarray(self.short_ma), np.asarray(self.long_ma)
+        prev_short_ma, prev_long_ma = np.r_[np.nan, short_ma[:-1]], np.r_[np.nan, long_ma[:-1]]
+        buy = (prev_short_ma < prev_long_ma) & (short_ma > long_ma)
+        sell = ~buy & (prev_long_ma < prev_short_ma) & (long_ma > short_ma)
+        return buy, sell
@@ -1,5 +1,6 @@
 from backtesting import Strategy
 import talib as ta
+import numpy as np
 
 class MeanReversionBollinger(Strategy):
     lookback_period = 40
@@ -17,3 +18,9 @@ class MeanReversionBollinger(Strategy):
             self.sell()
         elif self.data.Close[-1] < self.lower_band[-1]:
             self.buy()
+
+    def signals(self):
+        close = np.asarray(self.data.Close)
+        sell = close > np.asarray(self.upper_band)
+        buy = ~sell & (close < np.asarray(self.lower_band))
+        return buy, sell
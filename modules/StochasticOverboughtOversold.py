@@ -2,6 +2,7 @@
 from backtesting import Strategy
 # Technical Indicators library documentation: https://technical-analysis-library-in-python.readthedocs.io/en/latest/ta.html#
 import talib as ta
+import numpy as np
 
 # Strategy Description:
     # The Stochastic Overbought/Oversold strategy is a momentum-based strategy that uses the Stochastic Oscillator
@@ -45,3 +46,11 @@ class StochasticOverboughtOversold(Strategy):
         # Sell signal: Stochastic Oscillator (%K) rises above the overbought threshold and then crosses below it
         elif self.slowk[-1] > self.stoch_threshold_overbought and self.slowk[-2] < self.stoch_threshold_overbought:
             self.sell()
+
+    # Vectorized signals: bars where next() buys and sells
+    def signals(self):
+        slowk = np.asarray(self.slowk)
+        prev_slowk = np.r_[np.nan, slowk[:-1]]
+        buy = (slowk < self.stoch_threshold_oversold) & (prev_slowk > self.stoch_threshold_oversold)
+        sell = ~buy & (slowk > self.stoch_threshold_overbought) & (prev_slowk < self.stoch_threshold_overbought)
+        return buy, sell
@@ -0,0 +1,280 @@
+## LIBRARIES
+# Util
+import math
+
+import numpy as np
+import pandas as pd
+
+## CONSTANTS
+OPTIMIZE_METHODS = ['grid', 'random', 'halving', 'bayesian']
+# Default number of backtests of the random and model based searches
+DEFAULT_BUDGET = 100
+# Rounds without improvement before a search is stopped
+PLATEAU_PATIENCE = 5
+# Relative improvement of the best score that counts as progress
+PLATEAU_TOLERANCE = 1e-4
+# Successive halving keeps 1 / HALVING_ETA of the candidates in each rung
+HALVING_ETA = 3
+HALVING_RUNGS = 3
+# Candidate points scored by the acquisition function in each round of the bayesian search
+BAYESIAN_CANDIDATES = 2000
+
+## PARAMETER SPACE
+# Build the search space from the min, max and step of every parameter of the optimization form.
+# A parameter is an integer when its min, max and step are all integers, a float otherwise.
+def build_param_space(strategy_params):
+    param_space = {}
+    for param, value in strategy_params.items():
+        min_value = float(value['min'])
+        max_value = float(value['max'])
+        step_value = float(value.get('step') or 0)
+        if max_value < min_value:
+            raise ValueError(f"The max of '{param}' is lower than its min")
+        if step_value < 0:
+            raise ValueError(f"The step of '{param}' must be positive")
+        is_integer = all(float(v).is_integer() for v in (min_value, max_value, step_value))
+        param_space[param] = {'min': min_value, 'max': max_value, 'step': step_value, 'integer': is_integer}
+    return param_space
+
+# Every value of a parameter on its step grid, max included
+def grid_values(spec):
+    if spec['step'] == 0:
+        if spec['min'] != spec['max']:
+            raise ValueError('Grid search needs a step for every parameter')
+        n_values = 1
+    else:
+        n_values = int(math.floor((spec['max'] - spec['min']) / spec['step'] + 1e-9)) + 1
+    return [_cast(spec, spec['min'] + i * spec['step']) for i in range(n_values)]
+
+# Full grid of a parameter space, as ranges usable by the parameter sweep
+def get_param_grid(param_space):
+    return {param: grid_values(spec) for param, spec in param_space.items()}
+
+# Number of combinations of the grid, infinite if a float parameter has no step
+def get_grid_size(param_space):
+    size = 1
+    for spec in param_space.values():
+        if spec['step'] == 0 and spec['min'] != spec['max']:
+            return math.inf
+        size *= len(grid_values(spec))
+    return size
+
+def _cast(spec, value):
+    value = min(max(value, spec['min']), spec['max'])
+    return int(round(value)) if spec['integer'] else round(float(value), 10)
+
+# Map a point of the unit interval into the parameter range, snapped to the step grid
+def from_unit(spec, u):
+    value = spec['min'] + u * (spec['max'] - spec['min'])
+    if spec['step'] > 0:
+        value = spec['min'] + math.floor((value - spec['min']) / spec['step'] + 0.5) * spec['step']
+    return _cast(spec, value)
+
+# Map a parameter value into the unit interval
+def to_unit(spec, value):
+    width = spec['max'] - spec['min']
+    return (value - spec['min']) / width if width > 0 else 0.0
+
+## SEARCH STATE
+# Scores of the evaluated combinations and best score, used to detect plateaus
+class SearchHistory:
+    def __init__(self, param_space):
+        self.param_space = param_space
+        self.scores = {}
+        self.rows = []
+        self.best_params = None
+        self.best_score = -math.inf
+        self.stale_rounds = 0
+        self.full_equivalents = 0.0
+
+    # Hashable key of a parameter combination
+    def key(self, params):
+        return tuple(params[param] for param in self.param_space)
+
+    def seen(self, params):
+        return self.key(params) in self.scores
+
+    # Evaluate a round of new combinations and update the plateau counter
+    def run_round(self, evaluate, param_combos, fraction=1.0):
+        param_combos = [params for params in param_combos if fraction < 1 or not self.seen(params)]
+        if not param_combos:
+            self.stale_rounds += 1
+            return []
+        previous_best = self.best_score
+        scores = evaluate(param_combos, fraction)
+        self.full_equivalents += fraction * len(param_combos)
+        for params, score in zip(param_combos, scores):
+            score = float(score) if score is not None and not math.isnan(score) else math.nan
+            self.rows.append({**params, 'score': score, 'window': fraction})
+            if fraction < 1:
+                continue
+            self.scores[self.key(params)] = score
+            if not math.isnan(score) and score > self.best_score:
+                self.best_params, self.best_score = params, score
+        if previous_best == -math.inf:
+            improved = self.best_score > -math.inf
+        else:
+            improved = self.best_score > previous_best + PLATEAU_TOLERANCE * abs(previous_best)
+        self.stale_rounds = 0 if improved else self.stale_rounds + 1
+        return scores
+
+    def plateaued(self):
+        return self.stale_rounds >= PLATEAU_PATIENCE
+
+    # Summary of the search, with its evaluations ranked by score.
+    # When no combination made any trade, the first one evaluated on the whole range is kept like in the grid search.
+    def to_result(self, method, stopped_early):
+        best_params = self.best_params
+        if best_params is None and self.scores:
+            best_params = dict(zip(self.param_space, next(iter(self.scores))))
+        ranking = pd.DataFrame(self.rows)
+        ranking = ranking.sort_values(['window', 'score'], ascending=False, kind='stable', na_position='last').reset_index(drop=True)
+        ranking.index = ranking.index + 1
+        ranking.index.name = 'rank'
+        return {
+            'method': method,
+            'best_params': best_params,
+            'best_score': self.best_score if self.best_params is not None else None,
+            'ranking': ranking,
+            'evaluated': len(self.rows),
+            'full_equivalents': self.full_equivalents,
+            'stopped_early': stopped_early
+        }
+
+## OPTIMIZERS
+# All the methods take an `evaluate(param_combos, fraction)` function that returns the score of every combination
+# (NaN when it made no trades) over the last `fraction` of the date range, and an optional `progress` object
+# (e.g. a Job) whose total is set to the number of planned evaluations.
+
+# Random combinations of the parameter space, in rounds, until the budget is spent or the score plateaus
+def optimize_random(evaluate, param_space, budget=DEFAULT_BUDGET, batch_size=10, progress=None, random_state=None):
+    rng = np.random.default_rng(random_state)
+    history = SearchHistory(param_space)
+    budget = int(min(budget, get_grid_size(param_space)))
+    if progress is not None:
+        progress.set_total(budget)
+
+    stopped_early = False
+    while len(history.scores) < budget:
+        n_samples = min(batch_size, budget - len(history.scores))
+        param_combos = _sample_unseen(history, rng, n_samples)
+        history.run_round(evaluate, param_combos)
+        if history.plateaued():
+            stopped_early = len(history.scores) < budget
+            break
+    return history.to_result('random', stopped_early)
+
+# Successive halving: many random combinations on a short recent window, keeping the best 1 / eta of them
+# for a window eta times longer, until the last rung runs on the whole date range
+def optimize_halving(evaluate, param_space, budget=DEFAULT_BUDGET, eta=HALVING_ETA, rungs=HALVING_RUNGS, progress=None, random_state=None):
+    rng = np.random.default_rng(random_state)
+    history = SearchHistory(param_space)
+
+    # The cost of every rung is about the same, so the budget of full backtests is split between them
+    n_configs = int(min(max(budget * eta ** (rungs - 1) // rungs, eta ** (rungs - 1)), get_grid_size(param_space)))
+    schedule = []
+    for rung in range(rungs):
+        schedule.append((max(n_configs // eta ** rung, 1), eta ** (rung - rungs + 1)))
+    if progress is not None:
+        progress.set_total(sum(n for n, _ in schedule))
+
+    param_combos = _sample_unseen(history, rng, n_configs)
+    for n_keep, fraction in schedule:
+        param_combos = param_combos[:n_keep]
+        scores = history.run_round(evaluate, param_combos, fraction)
+        # Keep the best combinations for the next, longer window
+        order = sorted(range(len(param_combos)), key=lambda i: -scores[i] if not math.isnan(scores[i]) else math.inf)
+        param_combos = [param_combos[i] for i in order]
+    return history.to_result('halving', False)
+
+# Model based search: a gaussian process fitted on the evaluated combinations proposes the points with the
+# highest expected improvement, until the budget is spent or the score plateaus
+def optimize_bayesian(evaluate, param_space, budget=DEFAULT_BUDGET, batch_size=5, progress=None, random_state=None):
+    rng = np.random.default_rng(random_state)
+    history = SearchHistory(param_space)
+    specs = list(param_space.values())
+    budget = int(min(budget, get_grid_size(param_space)))
+    if progress is not None:
+        progress.set_total(budget)
+
+    # Random initial design
+    n_init = min(max(5, 2 * len(specs)), budget)
+    history.run_round(evaluate, _sample_unseen(history, rng, n_init))
+
+    stopped_early = False
+    while len(history.scores) < budget:
+        X = np.array([[to_unit(spec, value) for spec, value in zip(specs, key)] for key in history.scores])
+        y = np.array(list(history.scores.values()))
+        # Runs without trades count as the worst score seen
+        finite = ~np.isnan(y)
+        y = np.where(finite, y, y[finite].min() if finite.any() else 0.0)
+
+        # Candidates around the best combination and all over the space
+        candidates = rng.random((BAYESIAN_CANDIDATES, len(specs)))
+        if history.best_params is not None:
+            best = np.array([to_unit(spec, history.best_params[param]) for param, spec in param_space.items()])
+            local = best + rng.normal(0, 0.05, (BAYESIAN_CANDIDATES // 4, len(specs)))
+            candidates = np.vstack([candidates, np.clip(local, 0, 1)])
+        expected_improvement = _expected_improvement(X, y, candidates)
+
+        # Best unseen and distinct candidates
+        n_samples = min(batch_size, budget - len(history.scores))
+        param_combos = []
+        keys = set()
+        for index in np.argsort(-expected_improvement):
+            params = {param: from_unit(spec, u) for (param, spec), u in zip(param_space.items(), candidates[index])}
+            key = history.key(params)
+            if key in keys or history.seen(params):
+                continue
+            keys.add(key)
+            param_combos.append(params)
+            if len(param_combos) == n_samples:
+                break
+        if not param_combos:
+            break
+
+        history.run_round(evaluate, param_combos)
+        if history.plateaued():
+            stopped_early = len(history.scores) < budget
+            break
+    return history.to_result('bayesian', stopped_early)
+
+## HELPERS
+# Draw combinations that have not been evaluated yet
+def _sample_unseen(history, rng, n_samples):
+    param_combos = []
+    keys = set()
+    # Bounded number of attempts, small grids may run out of new combinations
+    for _ in range(n_samples * 20):
+        params = {param: from_unit(spec, u) for (param, spec), u in zip(history.param_space.items(), rng.random(len(history.param_space)))}
+        key = history.key(params)
+        if key in keys or history.seen(params):
+            continue
+        keys.add(key)
+        param_combos.append(params)
+        if len(param_combos) == n_samples:
+            break
+    return param_combos
+
+# Expected improvement of a gaussian process with RBF kernel fitted on (X, y) at the candidate points
+def _expected_improvement(X, y, candidates, length_scale=0.2, noise=1e-6, xi=0.01):
+    y_std = y.std() or 1.0
+    y_norm = (y - y.mean()) / y_std
+
+    def kernel(a, b):
+        distances = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1)
+        return np.exp(-0.5 * distances / length_scale ** 2)
+
+    K = kernel(X, X) + noise * np.eye(len(X))
+    L = np.linalg.cholesky(K + 1e-9 * np.eye(len(X)))
+    alpha = np.linalg.solve(L.T, np.linalg.solve(L, y_norm))
+    K_candidates = kernel(candidates, X)
+    mean = K_candidates @ alpha
+    v = np.linalg.solve(L, K_candidates.T)
+    std = np.sqrt(np.clip(1.0 - (v ** 2).sum(axis=0), 1e-12, None))
+
+    improvement = mean - y_norm.max() - xi
+    z = improvement / std
+    cdf = 0.5 * (1 + np.vectorize(math.erf)(z / math.sqrt(2)))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi)
+    return improvement * cdf + std * pdf
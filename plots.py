@@ -0,0 +1,80 @@
+## LIBRARIES
+# Util
+import os
+import re
+import threading
+import uuid
+
+# Backtesting
+from backtest_tasks import make_backtest, run_backtest
+# Background jobs
+import jobs
+
+## CONSTANTS
+PLOT_DIR = 'static/html_outputs'
+# Plot files are named by the strategy and the hash of the backtest inputs
+PLOT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_]+\.html$')
+
+## STATE
+# Plots being rendered by the worker processes and the errors of the failed ones, by file name
+_renders = {}
+_errors = {}
+_renders_lock = threading.Lock()
+
+## WORKER TASKS
+# Run a backtest record and save its plot. The plot is written to a temporary file and renamed,
+# so the page never loads a partial file and concurrent renders of the same inputs do not clash.
+def render_plot_task(stock_data, strategy_class, bt_document, plot_filename):
+    bt = make_backtest(stock_data, strategy_class, bt_document)
+    result = run_backtest(bt, bt_document)
+    tmp_filename = f"{plot_filename[:-5]}_{uuid.uuid4().hex[:8]}.html"
+    try:
+        bt.plot(results=result, filename=tmp_filename, open_browser=False)
+        # The title of the page is the file name
+        with open(tmp_filename, encoding='utf-8') as file:
+            html = file.read().replace(tmp_filename, plot_filename)
+        with open(tmp_filename, 'w', encoding='utf-8') as file:
+            file.write(html)
+        os.replace(tmp_filename, plot_filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+    return plot_filename
+
+## FUNCTIONS
+# Render a plot on the worker pool unless it is already on disk or being rendered
+def submit_plot(plot_filename, stock_data, strategy_class, bt_document):
+    if os.path.exists(plot_filename):
+        return
+    with _renders_lock:
+        if plot_filename in _renders:
+            return
+        _errors.pop(plot_filename, None)
+        future = jobs.get_process_pool().submit(render_plot_task, stock_data, strategy_class, bt_document, plot_filename)
+        _renders[plot_filename] = future
+    future.add_done_callback(lambda future: _finish_render(plot_filename, future))
+
+# 'ready' when the plot file exists, 'rendering', 'failed' (with the error) or 'missing'
+def get_plot_status(plot_filename):
+    if os.path.exists(plot_filename):
+        return 'ready', None
+    with _renders_lock:
+        if plot_filename in _renders:
+            return 'rendering', None
+        if plot_filename in _errors:
+            return 'failed', _errors[plot_filename]
+    return 'missing', None
+
+# Path of a plot from the name used in its URL, None if it is not a plot name
+def get_plot_path(plot_name):
+    if not PLOT_NAME_PATTERN.match(plot_name):
+        return None
+    return f'{PLOT_DIR}/{plot_name}'
+
+## HELPERS
+def _finish_render(plot_filename, future):
+    with _renders_lock:
+        _renders.pop(plot_filename, None)
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error rendering the plot '{plot_filename}': {future.exception()}")
+            _errors[plot_filename] = str(future.exception())
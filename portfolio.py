@@ -0,0 +1,41 @@
+## LIBRARIES
+# Util
+import pandas as pd
+
+from json_values import to_json_value
+
+# Backtesting
+from backtesting._stats import compute_stats
+from backtest_tasks import INITIAL_CASH, make_backtest, run_backtest
+
+## CONSTANTS
+# Statistics returned for every ticker of a portfolio
+TICKER_STATS = ['Return [%]', 'Return (Ann.) [%]', 'Volatility (Ann.) [%]', 'Sharpe Ratio', 'Max. Drawdown [%]',
+                '# Trades', 'Win Rate [%]', 'Exposure Time [%]', 'Buy & Hold Return [%]', 'Equity Final [$]']
+# Statistics of the equal weighted portfolio
+PORTFOLIO_STATS = ['Start', 'End', 'Equity Final [$]', 'Equity Peak [$]', 'Return [%]', 'Return (Ann.) [%]',
+                   'Volatility (Ann.) [%]', 'CAGR [%]', 'Sharpe Ratio', 'Sortino Ratio', 'Calmar Ratio',
+                   'Max. Drawdown [%]', 'Avg. Drawdown [%]']
+
+## WORKER TASKS
+# Run a backtest record on the data of one ticker, returning its main statistics and its equity curve
+def portfolio_backtest_task(ticker, stock_data, strategy_class, bt_document):
+    bt_document = {**bt_document, 'ticker': ticker}
+    bt = make_backtest(stock_data, strategy_class, bt_document)
+    result = run_backtest(bt, bt_document)
+    stats = {column: to_json_value(result[column]) for column in TICKER_STATS}
+    return {'ticker': ticker, 'stats': stats, 'equity': result['_equity_curve']['Equity']}
+
+## FUNCTIONS
+# Equal weighted portfolio of the equity curves of several tickers: the cash is split evenly between them and the
+# part of a ticker stays in cash before its first bar and after its last one
+def combine_equity_curves(equity_curves):
+    curves = pd.concat({ticker: equity / INITIAL_CASH for ticker, equity in equity_curves.items()}, axis=1).sort_index()
+    curves = curves.ffill().fillna(1.0)
+    return curves.mean(axis=1) * INITIAL_CASH
+
+# Statistics of a portfolio equity curve, computed like the ones of a backtest
+def get_portfolio_stats(equity):
+    ohlc_data = pd.DataFrame({'Close': equity.to_numpy()}, index=equity.index)
+    stats = compute_stats(trades=[], equity=equity.to_numpy(), ohlc_data=ohlc_data, strategy_instance=None, risk_free_rate=0.0)
+    return {column: to_json_value(stats[column]) for column in PORTFOLIO_STATS}
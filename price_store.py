@@ -0,0 +1,153 @@
+## LIBRARIES
+# Util
+import os
+import re
+import threading
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Cache
+from bytes_cache import BytesLRUCache
+
+## CONSTANTS
+# Directory with one price file per ticker
+PRICE_STORE_DIR = 'price_store'
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Memory budget of the series kept open by every process
+PRICE_CACHE_BYTES = 512 * 1024 * 1024
+# Tickers are used as file names
+TICKER_PATTERN = re.compile(r'^[A-Za-z0-9^=_\-][A-Za-z0-9.^=_\-]*$')
+# Intervals of the intraday series of the API, every one stored in its own subdirectory
+INTRADAY_INTERVALS = ['1min', '5min', '15min', '30min', '60min']
+
+## STORE
+# Every ticker is stored in a .npy file of shape (1 + columns, bars) with one contiguous float64 row per column,
+# the daily series in the store directory and the intraday ones in a subdirectory per interval.
+# The first row holds the dates as int64 nanoseconds, stored with the bits of the float64 array, so the whole
+# series is a single file that is replaced atomically and memory mapped by the readers.
+# The full series of the most used tickers are kept in an LRU cache, so a date range is only a slice of them.
+_series_cache = BytesLRUCache(PRICE_CACHE_BYTES)
+_open_lock = threading.Lock()
+
+# Change the directory of the store and the memory budget of its cache
+def configure_price_store(directory=None, cache_bytes=None):
+    global PRICE_STORE_DIR, PRICE_CACHE_BYTES
+    if directory:
+        PRICE_STORE_DIR = directory
+        _series_cache.clear()
+    if cache_bytes:
+        PRICE_CACHE_BYTES = int(cache_bytes)
+        _series_cache.resize(PRICE_CACHE_BYTES)
+
+def get_price_cache_stats():
+    return _series_cache.stats()
+
+def is_valid_ticker(ticker):
+    return isinstance(ticker, str) and bool(TICKER_PATTERN.match(ticker))
+
+# Directory of the daily series, or of the intraday series of an interval
+def get_store_dir(interval=None):
+    if interval is None:
+        return PRICE_STORE_DIR
+    if interval not in INTRADAY_INTERVALS:
+        raise ValueError(f"Invalid interval '{interval}'")
+    return os.path.join(PRICE_STORE_DIR, interval)
+
+def get_price_path(ticker, interval=None):
+    if not is_valid_ticker(ticker):
+        raise ValueError(f"Invalid ticker '{ticker}'")
+    return os.path.join(get_store_dir(interval), f'{ticker}.npy')
+
+def has_prices(ticker, interval=None):
+    return os.path.exists(get_price_path(ticker, interval))
+
+# Tickers in the store
+def list_tickers(interval=None):
+    store_dir = get_store_dir(interval)
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(name[:-4] for name in os.listdir(store_dir) if name.endswith('.npy'))
+
+# Replace the prices of a ticker with a DataFrame of OHLCV columns and a date index
+def write_prices(ticker, df, interval=None):
+    path = get_price_path(ticker, interval)
+    df = df.sort_index()
+    prices = np.empty((1 + len(PRICE_COLUMNS), len(df)), dtype='float64')
+    prices[0].view('int64')[:] = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').view('int64')
+    for i, column in enumerate(PRICE_COLUMNS, start=1):
+        prices[i] = df[column].to_numpy(dtype='float64')
+
+    # Write to a temporary file and rename it, the readers see either the old or the new series
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, prices)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _series_cache.pop(path)
+
+def delete_prices(ticker, interval=None):
+    path = get_price_path(ticker, interval)
+    _series_cache.pop(path)
+    if os.path.exists(path):
+        os.remove(path)
+
+# Version of the file of a ticker, it changes every time the file is replaced. None if it is not stored.
+def get_price_version(ticker, interval=None):
+    try:
+        stat = os.stat(get_price_path(ticker, interval))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+# Dates and full DataFrame of a ticker over its mapped file, opened again when the file changes
+# (other processes, like the ingestion of new prices, may replace it)
+def _open_prices(ticker, interval=None):
+    path = get_price_path(ticker, interval)
+    version = get_price_version(ticker, interval)
+    if version is None:
+        _series_cache.pop(path)
+        return None
+    cached = _series_cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    with _open_lock:
+        prices = np.load(path, mmap_mode='r')
+        dates = prices[0].view('int64').view('datetime64[ns]')
+        # The rows of the file are the columns of the DataFrame, its transpose is used as the single block of values
+        series = pd.DataFrame(prices[1:].T, index=pd.DatetimeIndex(dates), columns=PRICE_COLUMNS, copy=False)
+        _series_cache.put(path, (version, dates, series), prices.nbytes)
+    return dates, series
+
+# First and last date of a ticker, None if it is not stored
+def get_date_range(ticker, interval=None):
+    opened = _open_prices(ticker, interval)
+    if opened is None or not len(opened[0]):
+        return None
+    dates = opened[0]
+    return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+# Prices of a ticker between two dates (both included), as a slice of its full series without copies
+def read_prices(ticker, start_date=None, end_date=None, interval=None):
+    opened = _open_prices(ticker, interval)
+    if opened is None:
+        return pd.DataFrame(columns=PRICE_COLUMNS, dtype='float64', index=pd.DatetimeIndex([]))
+    dates, series = opened
+    start = np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date), 'ns'), side='left') if start_date else 0
+    end = np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date), 'ns'), side='right') if end_date else len(dates)
+    return series.iloc[start:end]
+
+# Prices of several tickers between two dates in one call, the tickers that are not stored are left out
+def read_prices_bulk(tickers, start_date=None, end_date=None, interval=None):
+    prices = {}
+    for ticker in tickers:
+        data = read_prices(ticker, start_date, end_date, interval) if is_valid_ticker(ticker) else None
+        if data is not None and len(data):
+            prices[ticker] = data
+    return prices
@@ -0,0 +1,145 @@
+## LIBRARIES
+# Util
+import numpy as np
+import pandas as pd
+
+# Price store
+from price_store import INTRADAY_INTERVALS, PRICE_COLUMNS, get_price_path, get_price_version, has_prices, read_prices, is_valid_ticker
+# Cache
+from bytes_cache import BytesLRUCache
+
+## CONSTANTS
+# Calendar bars of the daily series, by the frequency given in a backtest
+CALENDAR_FREQUENCIES = {'W': 'W', 'M': 'M', 'Q': 'Q', 'Y': 'Y'}
+# Memory budget of the resampled series kept by every process
+RESAMPLE_CACHE_BYTES = 256 * 1024 * 1024
+
+## CACHE
+# Full resampled series of the most used tickers and frequencies, with the dates of the last bar of every group,
+# valid while the stored series they come from does not change
+_resampled_cache = BytesLRUCache(RESAMPLE_CACHE_BYTES)
+
+def configure_resample_cache(cache_bytes=None):
+    global RESAMPLE_CACHE_BYTES
+    if cache_bytes:
+        RESAMPLE_CACHE_BYTES = int(cache_bytes)
+        _resampled_cache.resize(RESAMPLE_CACHE_BYTES)
+
+def get_resample_cache_stats():
+    return _resampled_cache.stats()
+
+## FUNCTIONS
+# Bar size of a backtest: a number of daily bars (the frequency of previous versions), a calendar period of the daily
+# bars ('W', 'M', 'Q', 'Y') or an intraday interval ('5min', '2h', ...) built from the largest stored intraday
+# interval that divides it. Raises ValueError if it is not a valid frequency.
+def parse_frequency(frequency):
+    value = str(frequency).strip()
+    if value.isdigit():
+        if int(value) < 1:
+            raise ValueError(f"Invalid frequency '{frequency}'")
+        return {'kind': 'bars', 'bars': int(value), 'interval': None}
+    if value.upper() in CALENDAR_FREQUENCIES:
+        return {'kind': 'calendar', 'period': CALENDAR_FREQUENCIES[value.upper()], 'interval': None}
+
+    try:
+        bar_size = pd.Timedelta(value)
+    except ValueError:
+        raise ValueError(f"Invalid frequency '{frequency}'")
+    intervals = [interval for interval in INTRADAY_INTERVALS if bar_size % pd.Timedelta(interval) == pd.Timedelta(0)]
+    if bar_size <= pd.Timedelta(0) or bar_size >= pd.Timedelta(days=1) or not intervals:
+        raise ValueError(f"Invalid frequency '{frequency}'")
+    return {'kind': 'intraday', 'bar_size': bar_size, 'interval': intervals[-1], 'intervals': intervals}
+
+# Frequency as stored in the backtest records: an integer for the number of daily bars, a string otherwise
+def normalize_frequency(frequency):
+    spec = parse_frequency(frequency)
+    if spec['kind'] == 'bars':
+        return spec['bars']
+    return str(frequency).strip().upper() if spec['kind'] == 'calendar' else str(frequency).strip()
+
+# Positions of the first bar of every group of a series
+def get_group_starts(index, spec):
+    n = len(index)
+    if spec['kind'] == 'bars':
+        return np.arange(0, n, spec['bars'])
+    if spec['kind'] == 'calendar':
+        groups = index.to_period(spec['period']).asi8
+    else:
+        groups = index.floor(spec['bar_size']).asi8
+    return np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if n else np.array([], dtype=int)
+
+# OHLCV bars of the groups of a series: the open of the first bar, the highest high, the lowest low, the close of
+# the last bar and the total volume, dated by the first bar of the group
+def aggregate_ohlcv(df, starts):
+    if not len(starts):
+        return df.iloc[:0].copy()
+    ends = np.r_[starts[1:], len(df)] - 1
+    return pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(df['Volume'].to_numpy(), starts)
+    }, index=df.index[starts], columns=PRICE_COLUMNS)
+
+def resample_prices(df, frequency):
+    spec = parse_frequency(frequency)
+    return aggregate_ohlcv(df, get_group_starts(df.index, spec))
+
+# Prices of a ticker between two dates at the frequency of a backtest. Daily and stored intraday bars are slices of
+# the price store; the rest are aggregated once over the whole series and cached until the series changes.
+# Only the bars whose whole group is between the dates are returned, so a bar never uses prices out of the range.
+def get_resampled_prices(ticker, start_date, end_date, frequency):
+    spec = parse_frequency(frequency)
+    interval = get_source_interval(ticker, spec)
+    # The end date of intraday bars includes the whole day
+    if interval and end_date and pd.Timestamp(end_date) == pd.Timestamp(end_date).normalize():
+        end_date = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    if (spec['kind'] == 'bars' and spec['bars'] == 1) or (spec['kind'] == 'intraday' and spec['bar_size'] == pd.Timedelta(interval)):
+        return read_prices(ticker, start_date, end_date, interval)
+
+    version = get_price_version(ticker, interval)
+    if version is None:
+        return read_prices(ticker, start_date, end_date, interval)
+    key = (get_price_path(ticker, interval), normalize_frequency(frequency))
+    cached = _resampled_cache.get(key)
+    if cached is None or cached[0] != version:
+        prices = read_prices(ticker, interval=interval)
+        starts = get_group_starts(prices.index, spec)
+        bars = aggregate_ohlcv(prices, starts)
+        last_dates = prices.index[np.r_[starts[1:], len(prices)] - 1] if len(starts) else prices.index[:0]
+        cached = (version, bars, last_dates)
+        _resampled_cache.put(key, cached, int(bars.memory_usage(index=True).sum()) + last_dates.nbytes)
+
+    _, bars, last_dates = cached
+    in_range = np.ones(len(bars), dtype=bool)
+    if start_date:
+        in_range &= bars.index >= pd.Timestamp(start_date)
+    if end_date:
+        in_range &= last_dates <= pd.Timestamp(end_date)
+    return bars[in_range]
+
+# Stored interval the intraday bars of a ticker are built from: the largest stored one that divides the bar size,
+# or the one parse_frequency() gives if none is stored yet
+def get_source_interval(ticker, spec):
+    if spec['kind'] != 'intraday':
+        return None
+    stored = [interval for interval in spec['intervals'] if has_prices(ticker, interval)]
+    return stored[-1] if stored else spec['interval']
+
+# Resampled prices of several tickers, the tickers that are not stored are left out
+def get_resampled_prices_bulk(tickers, start_date, end_date, frequency):
+    prices = {}
+    for ticker in tickers:
+        data = get_resampled_prices(ticker, start_date, end_date, frequency) if is_valid_ticker(ticker) else None
+        if data is not None and len(data):
+            prices[ticker] = data
+    return prices
+
+# Bars per year of a series, like compute_stats() annualizes its returns
+def get_periods_per_year(index):
+    if len(index) < 2:
+        return 252
+    period_days = pd.Series(index[-100:]).diff().dropna().median().days
+    have_weekends = index.dayofweek.to_series().between(5, 6).mean() > 2 / 7 * .6
+    return {7: 52, 31: 12, 365: 1}.get(period_days, 365 if have_weekends else 252)
@@ -0,0 +1,57 @@
+## LIBRARIES
+# Util
+import hashlib
+import json
+import pickle
+from datetime import datetime, timezone
+
+import pandas as pd
+
+## CONSTANTS
+# Fields of a backtest document that determine the outcome of the simulation
+RESULT_KEY_FIELDS = ['strategy_id', 'ticker', 'start_date', 'end_date', 'frequency', 'commission', 'opt_values']
+
+## FUNCTIONS
+# Compute the content hash of the inputs that produce a backtest result, including the version of the strategy
+# so the results of a changed strategy are computed again
+def compute_result_key(bt_document, strategy_version=None):
+    key_data = {field: bt_document.get(field) for field in RESULT_KEY_FIELDS}
+    key_data['strategy_version'] = strategy_version
+    key_string = json.dumps(key_data, sort_keys=True, default=str)
+    return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
+# Store the stats, equity curve and trades of a backtest run under the backtest name
+def save_results(collection, name, key, result):
+    result_document = {
+        'name': name,
+        'key': key,
+        'strategy': str(result['_strategy']),
+        'stats': pickle.dumps(result[:-3]),
+        'equity_curve': pickle.dumps(result['_equity_curve']),
+        'trades': pickle.dumps(result['_trades']),
+        'created_at': datetime.now(timezone.utc)
+    }
+    collection.update_one({'name': name}, {'$set': result_document}, upsert=True)
+
+# Load the precomputed results of a backtest, only if they were computed with the same inputs
+def load_results(collection, name, key):
+    result_document = collection.find_one({'name': name, 'key': key})
+    if result_document is None:
+        return None
+
+    # Rebuild the Series with the same layout returned by Backtest.run()
+    stats = pickle.loads(result_document['stats'])
+    extra = pd.Series({
+        '_strategy': result_document['strategy'],
+        '_equity_curve': pickle.loads(result_document['equity_curve']),
+        '_trades': pickle.loads(result_document['trades'])
+    }, dtype=object)
+    return pd.concat([stats, extra])
+
+# Move the stored results when a backtest is renamed. The new name must not belong to another backtest.
+def rename_results(collection, old_name, new_name):
+    collection.update_one({'name': old_name}, {'$set': {'name': new_name}})
+
+# Remove the stored results of the given backtests
+def delete_results(collection, names):
+    return collection.delete_many({'name': {'$in': list(names)}})
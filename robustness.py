@@ -0,0 +1,187 @@
+## LIBRARIES
+# Util
+import time
+
+import numpy as np
+
+from json_values import to_float
+
+# Background jobs
+import jobs
+
+## CONSTANTS
+ROBUSTNESS_METHODS = ['trades', 'shuffle', 'block']
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 1000000
+# Bars of every block of the block bootstrap of returns
+DEFAULT_BLOCK_SIZE = 20
+# Largest (simulations x steps) matrix built at once, bounds the memory of a chunk to a few tens of MB
+MATRIX_CELLS = 4 * 1024 * 1024
+# Simulations above which the chunks are run on the worker processes
+PROCESS_SIMULATIONS = 200000
+# Returns of -100% or less are clipped, the logarithm of the growth must be finite
+MIN_RETURN = -1 + 1e-12
+PERCENTILES = [5, 25, 50, 75, 95]
+HISTOGRAM_BINS = 30
+
+## WORKER TASKS
+# Run `n_sims` resamples of the trade or bar returns of a backtest and return the Sharpe ratio, maximum drawdown
+# and final equity of every one of them:
+# - trades: the trade returns are drawn with replacement
+# - shuffle: the order of the trades is permuted (the final equity is the same, the drawdowns change)
+# - block: circular blocks of `block_size` consecutive bar returns are drawn with replacement
+def simulate_chunk_task(method, returns, n_sims, periods_per_year, initial_equity, seed, block_size=DEFAULT_BLOCK_SIZE):
+    rng = np.random.default_rng(seed)
+    returns = np.asarray(returns, dtype=float)
+    n_steps = len(returns)
+    block_size = min(block_size, n_steps)
+    # The block bootstrap works with one column per block instead of one per bar
+    n_columns = -(-n_steps // block_size) if method == 'block' else n_steps
+    tables = get_block_tables(returns, block_size) if method == 'block' else None
+    batch = max(MATRIX_CELLS // n_columns, 1)
+
+    metrics = {'sharpe': [], 'max_drawdown': [], 'final_equity': []}
+    for done in range(0, n_sims, batch):
+        rows = min(batch, n_sims - done)
+        if method == 'trades':
+            stats = get_path_stats(returns[rng.integers(0, n_steps, size=(rows, n_steps))])
+        elif method == 'shuffle':
+            stats = get_path_stats(returns[rng.random((rows, n_steps)).argsort(axis=1)])
+        else:
+            stats = get_block_path_stats(tables, rng.integers(0, n_steps, size=(rows, n_columns)))
+        log_growth, mean_log, variance, max_drawdown = stats
+        metrics['sharpe'].append(annualized_sharpe(mean_log, variance, periods_per_year))
+        metrics['max_drawdown'].append(max_drawdown)
+        metrics['final_equity'].append(np.exp(log_growth) * initial_equity)
+    return {metric: np.concatenate(values) for metric, values in metrics.items()}
+
+## FUNCTIONS
+# Log growth, mean log return, variance of the returns and maximum drawdown [%] of every row of returns.
+# The initial equity counts as the first peak of the drawdowns.
+def get_path_stats(returns):
+    log_returns = np.log1p(np.maximum(returns, MIN_RETURN))
+    log_equity = np.cumsum(log_returns, axis=1)
+    peaks = np.maximum(np.maximum.accumulate(log_equity, axis=1), 0)
+    max_drawdown = np.expm1(-(peaks - log_equity).max(axis=1)) * 100
+    variance = returns.var(axis=1, ddof=1) if returns.shape[1] > 1 else np.zeros(len(returns))
+    return log_equity[:, -1], log_returns.mean(axis=1), variance, max_drawdown
+
+# Sums of the returns, of their squares and of their logs, and the lowest, highest and largest drawdown of the
+# log equity inside the block of every start bar, for the full blocks and for the shorter last block. The returns
+# are circular, so a block can wrap around the end of the series.
+def get_block_tables(returns, block_size):
+    n_steps = len(returns)
+    last_size = n_steps - (-(-n_steps // block_size) - 1) * block_size
+    bars = (np.arange(n_steps)[:, None] + np.arange(block_size)) % n_steps
+    block_returns = returns[bars]
+    block_log_equity = np.cumsum(np.log1p(np.maximum(block_returns, MIN_RETURN)), axis=1)
+    block_drawdown = np.maximum.accumulate(block_log_equity, axis=1) - block_log_equity
+
+    tables = {'n_steps': n_steps}
+    for name, size in (('full', block_size), ('last', last_size)):
+        log_equity = block_log_equity[:, :size]
+        tables[name] = {
+            'sum': block_returns[:, :size].sum(axis=1),
+            'sum_squares': (block_returns[:, :size] ** 2).sum(axis=1),
+            'log_growth': log_equity[:, -1],
+            'low': log_equity.min(axis=1),
+            'high': log_equity.max(axis=1),
+            'drawdown': np.maximum.accumulate(block_drawdown[:, :size], axis=1)[:, -1]
+        }
+    return tables
+
+# Same statistics as get_path_stats() for paths made of the blocks starting at the bars of every row, computed from
+# the block tables: the drawdown of a block is the larger of its inner drawdown and the fall of its lowest point
+# from the highest point before the block.
+def get_block_path_stats(tables, starts):
+    def block_values(field):
+        return np.concatenate([tables['full'][field][starts[:, :-1]], tables['last'][field][starts[:, -1:]]], axis=1)
+
+    n_steps = tables['n_steps']
+    log_growth = block_values('log_growth')
+    log_start = np.cumsum(log_growth, axis=1) - log_growth
+    peaks = np.maximum.accumulate(np.maximum(log_start + block_values('high'), 0), axis=1)
+    previous_peaks = np.concatenate([np.zeros((len(starts), 1)), peaks[:, :-1]], axis=1)
+    drawdown = np.maximum(previous_peaks - log_start - block_values('low'), block_values('drawdown')).max(axis=1)
+
+    total = block_values('sum').sum(axis=1)
+    variance = (block_values('sum_squares').sum(axis=1) - total ** 2 / n_steps) / max(n_steps - 1, 1)
+    return log_growth.sum(axis=1), log_growth.sum(axis=1) / n_steps, variance, np.expm1(-np.maximum(drawdown, 0)) * 100
+
+# Sharpe ratio annualized with the geometric mean like compute_stats()
+def annualized_sharpe(mean_log, variance, periods_per_year):
+    with np.errstate(over='ignore', invalid='ignore'):
+        growth = np.exp(mean_log)
+        annual_return = growth ** periods_per_year - 1
+        volatility = np.sqrt(np.maximum((variance + growth ** 2) ** periods_per_year - growth ** (2 * periods_per_year), 0))
+        return np.where(volatility > 0, annual_return / np.where(volatility > 0, volatility, 1), np.nan)
+
+# Returns resampled by a method, the number of them per year and the initial equity, from the stored results of a backtest
+def get_resample_returns(result, method):
+    equity = result['_equity_curve']['Equity']
+    years = max((equity.index[-1] - equity.index[0]).days / 365.25, 1 / 365.25)
+    if method == 'block':
+        returns = equity.pct_change().dropna().to_numpy()
+    else:
+        returns = result['_trades']['ReturnPct'].to_numpy(dtype=float)
+    if len(returns) < 2:
+        raise ValueError('The backtest needs at least 2 trades or bars to be resampled')
+    return returns, len(returns) / years, float(equity.iloc[0])
+
+# Monte Carlo robustness of a backtest: distributions of the Sharpe ratio, maximum drawdown and final equity over
+# the resamples of its results. Large runs are split in chunks with independent random streams on the worker pool.
+def run_monte_carlo(result, method='trades', n_sims=DEFAULT_SIMULATIONS, block_size=DEFAULT_BLOCK_SIZE, seed=None):
+    if method not in ROBUSTNESS_METHODS:
+        raise ValueError(f"Unknown resampling method '{method}'")
+    if not 1 <= n_sims <= MAX_SIMULATIONS:
+        raise ValueError(f'The number of simulations must be between 1 and {MAX_SIMULATIONS}')
+    if block_size < 1:
+        raise ValueError('The block size must be at least 1')
+    returns, periods_per_year, initial_equity = get_resample_returns(result, method)
+
+    start_time = time.perf_counter()
+    if n_sims < PROCESS_SIMULATIONS:
+        metrics = simulate_chunk_task(method, returns, n_sims, periods_per_year, initial_equity, seed, block_size)
+    else:
+        n_chunks = jobs.JOB_WORKERS
+        chunk_sims = [n_sims // n_chunks + (i < n_sims % n_chunks) for i in range(n_chunks)]
+        seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+        futures = [jobs.get_process_pool().submit(simulate_chunk_task, method, returns, sims, periods_per_year,
+                                                  initial_equity, chunk_seed, block_size)
+                   for sims, chunk_seed in zip(chunk_sims, seeds) if sims]
+        chunks = [future.result() for future in futures]
+        metrics = {metric: np.concatenate([chunk[metric] for chunk in chunks]) for metric in chunks[0]}
+    elapsed = time.perf_counter() - start_time
+
+    # Statistics of the returns in their original order, computed like the ones of the resamples
+    log_growth, mean_log, variance, max_drawdown = get_path_stats(returns[None, :])
+    actual = {
+        'sharpe': to_float(annualized_sharpe(mean_log, variance, periods_per_year)[0]),
+        'max_drawdown': to_float(max_drawdown[0]),
+        'final_equity': to_float(np.exp(log_growth[0]) * initial_equity)
+    }
+    return {
+        'method': method,
+        'simulations': n_sims,
+        'steps': len(returns),
+        'block_size': block_size if method == 'block' else None,
+        'actual': actual,
+        'distributions': {metric: summarize_distribution(values) for metric, values in metrics.items()},
+        'probability_of_loss': float((metrics['final_equity'] < initial_equity).mean()),
+        'elapsed': elapsed
+    }
+
+# Mean, deviation, percentiles and histogram of the values of a metric over the simulations
+def summarize_distribution(values):
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    # Metrics that do not depend on the resample (e.g. the final equity of shuffled trades) get a single bin
+    constant = np.ptp(values) <= 1e-9 * max(abs(values.mean()), 1)
+    counts, edges = np.histogram(values, bins=1 if constant else HISTOGRAM_BINS)
+    return {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'percentiles': {str(p): float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        'histogram': {'counts': counts.tolist(), 'edges': edges.tolist()}
+    }
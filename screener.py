@@ -0,0 +1,157 @@
+## LIBRARIES
+# Util
+import time
+
+import numpy as np
+import pandas as pd
+
+from json_values import to_float
+
+# Backtesting
+from backtest_tasks import make_backtest
+from vectorized import has_signals, get_signal_actions, run_fast
+from resampling import get_periods_per_year
+# Background jobs
+import jobs
+
+## CONSTANTS
+SCREEN_STATS = ['Return [%]', 'Return (Ann.) [%]', 'Volatility (Ann.) [%]', 'Sharpe Ratio', 'Max. Drawdown [%]',
+                '# Trades', 'Win Rate [%]', 'Exposure Time [%]', 'Buy & Hold Return [%]']
+# Tickers evaluated by every worker task
+SCREEN_CHUNK_SIZE = 100
+
+## WORKER TASKS
+# Evaluate a strategy on a chunk of tickers. The signals of every ticker come from the strategy itself and are
+# simulated together over a (dates x tickers) matrix; strategies without signals are run with the backtest engine.
+def screen_chunk_task(stock_data, strategy_class, bt_document, params):
+    rows = []
+    opens, closes, fills, buy_and_hold = {}, {}, {}, {}
+    for ticker, data in stock_data.items():
+        bt_ticker = {**bt_document, 'ticker': ticker}
+        try:
+            bt = make_backtest(data, strategy_class, bt_ticker)
+            signal_actions = get_signal_actions(bt, **params) if has_signals(strategy_class) else None
+            if signal_actions is None:
+                result = run_fast(bt, **params)
+                rows.append({'ticker': ticker, **{column: to_float(result[column]) for column in SCREEN_STATS},
+                             'engine': 'backtest'})
+                continue
+        except Exception as e:
+            rows.append({'ticker': ticker, 'error': str(e)})
+            continue
+
+        # The order of a signal is filled at the open of the next bar of the ticker
+        _, _, actions, start = signal_actions
+        close = bt._data.Close.to_numpy()
+        buy_and_hold[ticker] = (close[-1] / close[min(start - 1, len(close) - 1)] - 1) * 100
+        opens[ticker] = bt._data.Open
+        closes[ticker] = bt._data.Close
+        fills[ticker] = pd.Series(np.r_[0, actions[:-1]], index=bt._data.index)
+
+    if fills:
+        open_prices = pd.concat(opens, axis=1).sort_index()
+        close_prices = pd.concat(closes, axis=1).sort_index()
+        fill_actions = pd.concat(fills, axis=1).sort_index().fillna(0)
+        periods_per_year = get_periods_per_year(open_prices.index)
+        stats = simulate_signal_matrix(open_prices.to_numpy(), close_prices.to_numpy(), fill_actions.to_numpy(),
+                                       float(bt_document['commission']), periods_per_year)
+        for i, ticker in enumerate(open_prices.columns):
+            rows.append({'ticker': ticker, **{column: to_float(values[i]) for column, values in stats.items()},
+                         'Buy & Hold Return [%]': to_float(buy_and_hold[ticker]), 'engine': 'vectorized'})
+    return rows
+
+## FUNCTIONS
+# Simulate the fills of the signals of many tickers at once. Every column is a ticker, with NaN outside its
+# history; `fills` holds at every bar the action filled at its open (1 buy, -1 sell, 2 close the position).
+#
+# Like the backtests, every fill closes the open trade and opens a new one with the whole equity in the direction
+# of the signal, paying the commission on both sides, and the statistics follow the formulas of compute_stats().
+# Positions are fractional, so the results are a close approximation of the backtest engine, which buys whole units.
+def simulate_signal_matrix(open_prices, close_prices, fills, commission, periods_per_year):
+    valid = ~np.isnan(close_prices)
+    open_prices = pd.DataFrame(open_prices).ffill().to_numpy()
+    close_prices = pd.DataFrame(close_prices).ffill().to_numpy()
+
+    is_fill = fills != 0
+    direction = np.where(fills == 2, 0, fills)
+
+    # Entry price and direction of the trade open after the fills of every bar, and before them
+    entry = pd.DataFrame(np.where(is_fill, open_prices, np.nan)).ffill().to_numpy()
+    side = pd.DataFrame(np.where(is_fill, direction, np.nan)).ffill().fillna(0).to_numpy()
+    prev_entry = np.vstack([np.full((1, entry.shape[1]), np.nan), entry[:-1]])
+    prev_side = np.vstack([np.zeros((1, side.shape[1])), side[:-1]])
+
+    # Growth of the equity with every closed trade, net of the commissions of its entry and its exit
+    closes_trade = is_fill & (prev_side != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exit_ratio = open_prices / prev_entry
+        growth = np.where(closes_trade, 1 + prev_side * (exit_ratio - 1) - commission * (1 + exit_ratio), 1.0)
+        growth = np.maximum(growth, 0)
+        capital = np.cumprod(growth, axis=0)
+
+        # Equity at every close, marking the open trade to market
+        open_trade = side != 0
+        mark = np.where(open_trade, 1 + side * (close_prices / entry - 1) - commission, 1.0)
+        equity = capital * np.maximum(mark, 0)
+
+        returns = np.vstack([np.zeros((1, equity.shape[1])), equity[1:] / equity[:-1] - 1])
+        returns = np.where(valid & np.vstack([np.zeros((1, valid.shape[1]), dtype=bool), valid[:-1]]), returns, np.nan)
+
+        # Geometric mean of the bar returns, annualized like compute_stats()
+        n_bars = valid.sum(axis=0)
+        n_returns = np.maximum((~np.isnan(returns)).sum(axis=0), 1)
+        log_returns = np.log1p(np.where(returns > -1, returns, np.nan))
+        gmean_return = np.where(np.nanmin(returns, axis=0) > -1, np.expm1(np.nansum(log_returns, axis=0) / n_returns), 0)
+        annual_return = (1 + gmean_return) ** periods_per_year - 1
+        variance = np.nanvar(returns, axis=0, ddof=1)
+        volatility = np.sqrt((variance + (1 + gmean_return) ** 2) ** periods_per_year - (1 + gmean_return) ** (2 * periods_per_year))
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+        n_trades = closes_trade.sum(axis=0)
+        wins = (closes_trade & (growth > 1)).sum(axis=0)
+        # Bars in a trade that was closed before the end, the exit bars included
+        bar_index = np.arange(equity.shape[0])[:, None]
+        last_exit = np.where(n_trades > 0, equity.shape[0] - 1 - np.argmax(closes_trade[::-1], axis=0), -1)
+        exposed = ((side != 0) | closes_trade) & (bar_index <= last_exit) & valid
+
+        return {
+            'Return [%]': (equity[-1] - 1) * 100,
+            'Return (Ann.) [%]': annual_return * 100,
+            'Volatility (Ann.) [%]': volatility * 100,
+            'Sharpe Ratio': np.where(volatility > 0, annual_return / np.where(volatility > 0, volatility, 1), np.nan),
+            'Max. Drawdown [%]': np.nanmin(np.where(valid, drawdown, np.nan), axis=0) * 100,
+            '# Trades': n_trades,
+            'Win Rate [%]': np.where(n_trades > 0, wins / np.maximum(n_trades, 1) * 100, np.nan),
+            'Exposure Time [%]': exposed.sum(axis=0) / np.maximum(n_bars, 1) * 100
+        }
+
+# Evaluate a strategy with a set of parameters on every ticker, in chunks on the worker pool,
+# and rank the tickers by a statistic
+def run_screen(stock_data, strategy_class, bt_document, params, sort_by='Return [%]', job=None, chunk_size=SCREEN_CHUNK_SIZE):
+    if sort_by not in SCREEN_STATS:
+        raise ValueError(f"Unknown statistic '{sort_by}'")
+    submit = job.submit if job is not None else jobs.get_process_pool().submit
+    tickers = list(stock_data)
+    if job is not None:
+        job.set_total(len(tickers))
+
+    start_time = time.perf_counter()
+    futures = {}
+    for start in range(0, len(tickers), chunk_size):
+        chunk = {ticker: stock_data[ticker] for ticker in tickers[start:start + chunk_size]}
+        futures[submit(screen_chunk_task, chunk, strategy_class, bt_document, params)] = len(chunk)
+
+    rows = []
+    completed = job.iter_completed(futures) if job is not None else futures
+    for future in completed:
+        rows.extend(future.result())
+        if job is not None:
+            job.advance(futures[future])
+    elapsed = time.perf_counter() - start_time
+
+    errors = {row['ticker']: row['error'] for row in rows if 'error' in row}
+    leaderboard = pd.DataFrame([row for row in rows if 'error' not in row], columns=['ticker', *SCREEN_STATS, 'engine'])
+    leaderboard = leaderboard.sort_values(sort_by, ascending=False, kind='stable', na_position='last').reset_index(drop=True)
+    leaderboard.index = leaderboard.index + 1
+    leaderboard.index.name = 'rank'
+    return {'leaderboard': leaderboard, 'errors': errors, 'evaluated': len(tickers), 'elapsed': elapsed}
@@ -0,0 +1,146 @@
+## LIBRARIES
+# Data API
+from http_client import alphavantage_query
+# Util
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Price store
+from price_store import get_date_range, read_prices, write_prices
+
+## CONSTANTS
+# Trading days returned by the compact output of the API
+COMPACT_OUTPUT_BARS = 100
+# Relative difference between the stored and fetched prices of the same day that means the adjustment factor changed
+ADJUSTMENT_TOLERANCE = 1e-5
+# Seconds before the same ticker is fetched again when the API has no newer bars (e.g. weekends and holidays)
+REFRESH_INTERVAL = 3600
+
+## STATE
+_ticker_locks = {}
+_ticker_locks_lock = threading.Lock()
+# Time of the last fetch of every ticker
+_last_refresh = {}
+
+## FUNCTIONS
+# Calculate the adjustment factor and create adjusted DataFrame
+def adjust_stock_data(df):
+    df['factor'] = df['4. close'] / df['5. adjusted close']
+    adjusted_df = pd.DataFrame({
+        'Open': df['1. open'] / df['factor'],
+        'High': df['2. high'] / df['factor'],
+        'Low': df['3. low'] / df['factor'],
+        'Close': df['4. close'] / df['factor'],
+        'Volume': df['6. volume'] * df['factor']
+    })
+    return adjusted_df
+
+# Fetch the adjusted daily series of a ticker from the AlphaVantage API ('compact' is the last 100 days).
+# Without a key the configured keys of the HTTP client are used in turns.
+def fetch_stock_data(ticker, api_key=None, outputsize='full'):
+    response = alphavantage_query({'function': 'TIME_SERIES_DAILY_ADJUSTED', 'symbol': ticker, 'outputsize': outputsize},
+                                  api_key)
+    stock_data = response['Time Series (Daily)']
+
+    # Convert stock_data to DataFrame
+    df = pd.DataFrame.from_dict(stock_data, orient='index').astype(float)
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index(ascending=True)
+
+    # Adjust the stock data
+    return adjust_stock_data(df)
+
+# Fetch the intraday series of a ticker for an interval ('full' is the last 30 days of the API)
+def fetch_intraday_data(ticker, api_key, interval, outputsize='full'):
+    response = alphavantage_query({'function': 'TIME_SERIES_INTRADAY', 'symbol': ticker, 'interval': interval,
+                                   'outputsize': outputsize}, api_key)
+    stock_data = response[f'Time Series ({interval})']
+
+    df = pd.DataFrame.from_dict(stock_data, orient='index').astype(float)
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index(ascending=True)
+    return pd.DataFrame({
+        'Open': df['1. open'],
+        'High': df['2. high'],
+        'Low': df['3. low'],
+        'Close': df['4. close'],
+        'Volume': df['5. volume']
+    })
+
+# Make sure the stored series of a ticker reaches the end date, fetching only the missing tail when possible.
+# Returns 'cached', 'appended' or 'reloaded'; raises ValueError if the API does not know the ticker.
+def refresh_stock_data(ticker, end_date, api_key, fetch=fetch_stock_data):
+    with _get_ticker_lock(ticker):
+        # Another request may have refreshed the ticker while this one waited for the lock
+        date_range = get_date_range(ticker)
+        if date_range and (date_range[1] >= pd.Timestamp(end_date) or _recently_refreshed(ticker)):
+            return 'cached'
+
+        if date_range is None:
+            write_prices(ticker, fetch(ticker, api_key, 'full'))
+            _last_refresh[ticker] = time.time()
+            return 'reloaded'
+
+        # Trading days since the last stored bar, the compact output covers them when the gap is small
+        last_date = date_range[1]
+        gap = np.busday_count(last_date.date(), pd.Timestamp.today().date())
+        outputsize = 'compact' if gap < COMPACT_OUTPUT_BARS - 5 else 'full'
+        new_data = fetch(ticker, api_key, outputsize)
+        _last_refresh[ticker] = time.time()
+
+        # The fetched bars must overlap the stored ones with the same prices, otherwise a dividend or split
+        # changed the adjustment of the whole history and it is loaded again
+        stored = read_prices(ticker, new_data.index[0], last_date) if len(new_data) else None
+        if stored is None or not len(stored) or not _same_adjustment(stored, new_data):
+            if outputsize == 'compact':
+                new_data = fetch(ticker, api_key, 'full')
+            write_prices(ticker, new_data)
+            return 'reloaded'
+
+        tail = new_data[new_data.index > last_date]
+        if not len(tail):
+            return 'cached'
+        write_prices(ticker, pd.concat([read_prices(ticker), tail]))
+        return 'appended'
+
+# Add the latest intraday bars of an interval to the stored ones. The API only serves the last days of intraday
+# bars, so the history grows with every refresh; the fetched bars replace the stored bars of the same time.
+# Returns 'cached', 'appended' or 'reloaded' like refresh_stock_data().
+def refresh_intraday_data(ticker, interval, end_date, api_key, fetch=fetch_intraday_data):
+    refresh_key = (ticker, interval)
+    with _get_ticker_lock(refresh_key):
+        date_range = get_date_range(ticker, interval)
+        if date_range and (date_range[1].normalize() >= pd.Timestamp(end_date).normalize() or _recently_refreshed(refresh_key)):
+            return 'cached'
+
+        new_data = fetch(ticker, api_key, interval, 'full')
+        _last_refresh[refresh_key] = time.time()
+        if date_range is None:
+            write_prices(ticker, new_data, interval)
+            return 'reloaded'
+        if not len(new_data[new_data.index > date_range[1]]):
+            return 'cached'
+        merged = pd.concat([read_prices(ticker, interval=interval), new_data])
+        write_prices(ticker, merged[~merged.index.duplicated(keep='last')], interval)
+        return 'appended'
+
+## HELPERS
+# Locks and refresh times are kept by ticker, or by (ticker, interval) for the intraday series
+def _get_ticker_lock(key):
+    with _ticker_locks_lock:
+        return _ticker_locks.setdefault(key, threading.Lock())
+
+def _recently_refreshed(key):
+    return time.time() - _last_refresh.get(key, 0) < REFRESH_INTERVAL
+
+# Compare the close of the days present in both series
+def _same_adjustment(stored, new_data):
+    common_dates = stored.index.intersection(new_data.index)
+    if not len(common_dates):
+        return False
+    stored_close = stored.loc[common_dates, 'Close'].to_numpy()
+    new_close = new_data.loc[common_dates, 'Close'].to_numpy()
+    return bool(np.allclose(stored_close, new_close, rtol=ADJUSTMENT_TOLERANCE, atol=0))
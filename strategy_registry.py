@@ -0,0 +1,216 @@
+## LIBRARIES
+# Util
+import os
+import sys
+import time
+import types
+import pkgutil
+import hashlib
+import inspect
+import threading
+import importlib.util
+from abc import ABCMeta
+from collections.abc import Mapping
+from multiprocessing.reduction import ForkingPickler
+
+## CONSTANTS
+STRATEGY_MODULES_DIR = 'modules'
+# Seconds between the checks of the files of the strategies, the lookups in between use the loaded classes
+RELOAD_CHECK_INTERVAL = 2
+# Previous versions of the strategies kept compiled by every process, for the tasks sent before an upload
+VERSIONS_KEPT = 16
+
+## STATE
+# Compiled strategy classes by their modules directory, name and hash of their source, oldest first
+_versions = {}
+_versions_lock = threading.Lock()
+
+## STRATEGY CLASSES
+# Metaclass of the strategies loaded by the registries, which replaces ABCMeta (the metaclass of Strategy) when a
+# strategy is compiled. Only these classes are pickled as the version of their module, see the PICKLING section.
+class RegisteredStrategyType(ABCMeta):
+    pass
+
+## REGISTRY
+# Strategy classes by the name of their module. The names are found when the registry is created, but a module
+# (and talib, backtesting and the rest of its imports) is only imported the first time its strategy is used.
+# New and changed modules are picked up without restarting: a lookup checks the file of the module when its
+# last check is older than RELOAD_CHECK_INTERVAL, and compiles the module again if the hash of its source changed.
+class StrategyRegistry(Mapping):
+    def __init__(self, modules_dir=STRATEGY_MODULES_DIR):
+        self.modules_dir = modules_dir
+        # Loaded modules by name: the hash, size and modification time of their source, their strategy class,
+        # the time of their last check and the error of the last failed load
+        self._entries = {}
+        self._lock = threading.RLock()
+        self.scan()
+
+    # Names of the strategy modules in the directory
+    def scan(self):
+        self._names = [module_name for _, module_name, _ in pkgutil.iter_modules([self.modules_dir])]
+        self._scanned_at = time.monotonic()
+
+    def __getitem__(self, name):
+        strategy_class = self._get_entry(name)['class']
+        if strategy_class is None:
+            raise KeyError(name)
+        return strategy_class
+
+    def __iter__(self):
+        if time.monotonic() - self._scanned_at > RELOAD_CHECK_INTERVAL:
+            self.scan()
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    # Hash of the source of the strategy, it changes with every new version of the module. None if it is unknown.
+    def get_version(self, name):
+        try:
+            return self._get_entry(name)['digest']
+        except KeyError:
+            return None
+
+    # Check the file of a strategy on the next lookup, e.g. after it is uploaded
+    def invalidate(self, name):
+        with self._lock:
+            if name in self._entries:
+                self._entries[name]['checked_at'] = 0
+            self._scanned_at = 0
+
+    # Load a strategy and return the error of its module, None if it defines a strategy class
+    def check(self, name):
+        self.invalidate(name)
+        try:
+            entry = self._get_entry(name)
+        except KeyError:
+            return f"There is no strategy module '{name}'"
+        if entry['error']:
+            return entry['error']
+        return None if entry['class'] is not None else f"The module '{name}' does not define a Strategy subclass"
+
+    # Names of the strategies loaded so far
+    def loaded(self):
+        return [name for name, entry in self._entries.items() if entry['class'] is not None]
+
+    def _get_entry(self, name):
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() - entry['checked_at'] < RELOAD_CHECK_INTERVAL:
+            return entry
+
+        with self._lock:
+            if name not in self._names and time.monotonic() - self._scanned_at > RELOAD_CHECK_INTERVAL:
+                self.scan()
+            path = os.path.join(self.modules_dir, f'{name}.py')
+            if name not in self._names or not os.path.exists(path):
+                raise KeyError(name)
+            entry = self._entries.get(name)
+            stat = os.stat(path)
+            if entry is None or (entry['mtime_ns'], entry['size']) != (stat.st_mtime_ns, stat.st_size):
+                entry = self._load(name, path, entry)
+            entry['checked_at'] = time.monotonic()
+            return entry
+
+    # Compile the module again when its source changed. A module that fails keeps its previous version.
+    def _load(self, name, path, entry):
+        stat = os.stat(path)
+        with open(path, 'rb') as file:
+            source = file.read()
+        digest = hashlib.sha256(source).hexdigest()[:16]
+        if entry is not None and entry['digest'] == digest:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            return entry
+
+        new_entry = {'digest': digest, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'class': None, 'error': None}
+        try:
+            new_entry['class'] = load_strategy_class(self.modules_dir, name, path, source, digest)
+        except Exception as e:
+            print(f"Error loading the strategy '{name}': {e}")
+            if entry is not None and entry['class'] is not None:
+                new_entry.update({'digest': entry['digest'], 'class': entry['class']})
+            new_entry['error'] = f'{type(e).__name__}: {e}'
+        self._entries[name] = new_entry
+        return new_entry
+
+## FUNCTIONS
+# Compile the source of a strategy module, replacing the module of its previous version, and get the strategy
+# class defined in it (not the imported Strategy base class), None if it has none
+def load_strategy_class(modules_dir, module_name, path, source, digest):
+    from backtesting import Strategy
+
+    package = importlib.import_module(modules_dir)
+    full_name = f'{modules_dir}.{module_name}'
+    module = types.ModuleType(full_name)
+    module.__file__ = os.path.abspath(path)
+    module.__package__ = package.__name__
+    module.__strategy_digest__ = digest
+    code = compile(source, module.__file__, 'exec')
+
+    previous = sys.modules.get(full_name)
+    sys.modules[full_name] = module
+    try:
+        exec(code, module.__dict__)
+    except BaseException:
+        if previous is not None:
+            sys.modules[full_name] = previous
+        else:
+            del sys.modules[full_name]
+        raise
+    setattr(package, module_name, module)
+
+    strategy_class = next((cls for _, cls in inspect.getmembers(module, inspect.isclass)
+                           if issubclass(cls, Strategy) and cls.__module__ == full_name), None)
+    if strategy_class is not None:
+        # Strategies with a metaclass of their own keep it, and are pickled by name
+        if type(strategy_class) is ABCMeta:
+            strategy_class.__class__ = RegisteredStrategyType
+        strategy_class._strategy_source = (modules_dir, module_name, digest)
+        strategy_class._strategy_code = source
+        with _versions_lock:
+            _versions[(modules_dir, module_name, digest)] = strategy_class
+            while len(_versions) > VERSIONS_KEPT:
+                del _versions[next(iter(_versions))]
+    return strategy_class
+
+# Strategy class of an exact version of a module, for the worker processes. The source sent with the task is
+# compiled when the process does not have that version yet, so a module uploaded after the task was sent does
+# not change the code it runs.
+def load_registered_strategy(modules_dir, module_name, digest, source):
+    with _versions_lock:
+        strategy_class = _versions.get((modules_dir, module_name, digest))
+    if strategy_class is not None:
+        return strategy_class
+    if hashlib.sha256(source).hexdigest()[:16] != digest:
+        raise ValueError(f"The source of the strategy '{module_name}' does not match its version {digest}")
+    path = os.path.join(modules_dir, f'{module_name}.py')
+    strategy_class = load_strategy_class(modules_dir, module_name, path, source, digest)
+    if strategy_class is None:
+        raise ValueError(f"The module '{module_name}' does not define a Strategy subclass")
+    return strategy_class
+
+# Hash of the source a strategy class was compiled from, None for the classes not loaded by a registry
+def get_strategy_version(strategy_class):
+    source = getattr(strategy_class, '__dict__', {}).get('_strategy_source')
+    return source[2] if source else None
+
+# Module that is only imported when one of its attributes is used, for the libraries that are slow to import
+# and only needed by some requests
+def lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+## PICKLING
+# The strategies sent to the worker processes are pickled with the version and the source of their module, so
+# every worker runs the same version as the server whatever is on disk. Every other class, including the other
+# ABCs, is pickled by name as usual.
+def _reduce_class(cls):
+    return (load_registered_strategy, (*cls._strategy_source, cls._strategy_code))
+
+ForkingPickler.register(RegisteredStrategyType, _reduce_class)
@@ -0,0 +1,180 @@
+## LIBRARIES
+# Util
+import math
+import time
+from itertools import product
+from concurrent.futures import wait, FIRST_COMPLETED
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+# Backtesting
+from backtest_tasks import make_backtest
+from vectorized import run_fast
+from indicator_cache import get_indicator_cache_stats
+# Background jobs
+import jobs
+
+## CONSTANTS
+# Statistics kept for every combination in the ranking table
+SWEEP_STATS = ['# Trades', 'Return [%]', 'Sharpe Ratio', 'Max. Drawdown [%]', 'Win Rate [%]']
+# Upper bound of combinations per chunk, so the progress is still reported often
+MAX_CHUNK_SIZE = 100
+# Seconds between checks of the job cancellation while waiting for the chunks
+CANCEL_POLL_INTERVAL = 0.5
+
+## SHARED PRICE DATA
+# Blocks attached by this worker process, by name
+_attached = {}
+
+# Copy the stock data into a shared memory block, returns the block and a small descriptor for the workers
+def share_stock_data(stock_data):
+    index = stock_data.index.values.astype('datetime64[ns]').view('int64')
+    values = stock_data.to_numpy(dtype='float64')
+
+    shm = SharedMemory(create=True, size=max(index.nbytes + values.nbytes, 1))
+    np.ndarray(index.shape, dtype='int64', buffer=shm.buf)[:] = index
+    np.ndarray(values.shape, dtype='float64', buffer=shm.buf, offset=index.nbytes)[:] = values
+
+    data_descriptor = {'name': shm.name, 'rows': values.shape[0], 'columns': list(stock_data.columns)}
+    return shm, data_descriptor
+
+# Build a DataFrame over a shared memory block without copying it, attaching once per worker
+def attach_stock_data(data_descriptor):
+    name = data_descriptor['name']
+    if name not in _attached:
+        release_stock_data()
+        shm = _open_shared_memory(name)
+        rows, n_columns = data_descriptor['rows'], len(data_descriptor['columns'])
+        index = np.ndarray((rows,), dtype='int64', buffer=shm.buf)
+        values = np.ndarray((rows, n_columns), dtype='float64', buffer=shm.buf, offset=index.nbytes)
+        stock_data = pd.DataFrame(values, index=pd.DatetimeIndex(index.view('datetime64[ns]')),
+                                  columns=data_descriptor['columns'], copy=False)
+        _attached[name] = (shm, stock_data)
+    return _attached[name][1]
+
+# Detach the blocks of previous sweeps from this worker
+def release_stock_data():
+    for name in list(_attached):
+        shm, stock_data = _attached.pop(name)
+        del stock_data
+        try:
+            shm.close()
+        except BufferError:
+            # Still referenced by a Backtest, it is closed when garbage collected
+            pass
+
+# Attach to a block without registering it in the resource tracker, only the process that created it unlinks it.
+# Otherwise the tracker reports the blocks of the workers as leaked at shutdown.
+def _open_shared_memory(name):
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument, the registration is skipped while attaching
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None if rtype == 'shared_memory' else register(name, rtype)
+        try:
+            return SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+## WORKER TASKS
+# Evaluate a chunk of parameter combinations over the shared stock data,
+# with the hits and misses of the indicator cache of the worker during the chunk
+def evaluate_chunk_task(data_descriptor, strategy_class, bt_document, params_chunk, maximize):
+    cache_before = get_indicator_cache_stats()
+    stock_data = attach_stock_data(data_descriptor)
+    bt = make_backtest(stock_data, strategy_class, bt_document)
+
+    rows = []
+    for params in params_chunk:
+        stats = run_fast(bt, **params)
+        row = dict(params)
+        for column in SWEEP_STATS:
+            row[column] = float(stats[column])
+        # Runs without trades are not ranked, like in Backtest.optimize()
+        value = float(stats[maximize]) if stats['# Trades'] else math.nan
+        row[maximize] = value
+        rows.append(row)
+
+    cache_after = get_indicator_cache_stats()
+    cache_stats = {counter: cache_after[counter] - cache_before[counter] for counter in ('hits', 'misses')}
+    return {'rows': rows, 'indicator_cache': cache_stats}
+
+## FUNCTIONS
+# Expand the parameter ranges into every combination, in grid order
+def expand_grid(param_ranges):
+    param_names = list(param_ranges.keys())
+    return [dict(zip(param_names, values)) for values in product(*param_ranges.values())]
+
+# Number of combinations per chunk, so every worker gets several chunks
+def get_chunk_size(n_combos, workers=None):
+    workers = workers or jobs.JOB_WORKERS
+    return int(np.clip(n_combos // (workers * 4), 1, MAX_CHUNK_SIZE))
+
+# Evaluate every parameter combination on the worker pool and rank them by the metric to maximize.
+# When a job is given, its progress is updated and its cancellation is honoured, `update_total=False`
+# leaves the total of the job to the caller when the sweep is one round of a larger search.
+def run_sweep(stock_data, strategy_class, bt_document, param_combos, maximize, job=None, chunk_size=None, update_total=True):
+    if not param_combos:
+        raise ValueError('No parameter combinations to evaluate')
+    submit = job.submit if job is not None else jobs.get_process_pool().submit
+    chunk_size = chunk_size or get_chunk_size(len(param_combos))
+    if job is not None and update_total:
+        job.set_total(len(param_combos))
+
+    start_time = time.perf_counter()
+    shm, data_descriptor = share_stock_data(stock_data)
+    try:
+        futures = {}
+        for start in range(0, len(param_combos), chunk_size):
+            params_chunk = param_combos[start:start + chunk_size]
+            future = submit(evaluate_chunk_task, data_descriptor, strategy_class, bt_document, params_chunk, maximize)
+            futures[future] = start
+
+        rows = [None] * len(param_combos)
+        cache_stats = {'hits': 0, 'misses': 0}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if job is not None:
+                job.check_cancelled()
+            for future in done:
+                chunk = future.result()
+                chunk_rows = chunk['rows']
+                for counter in cache_stats:
+                    cache_stats[counter] += chunk['indicator_cache'][counter]
+                start = futures[future]
+                rows[start:start + len(chunk_rows)] = chunk_rows
+                if job is not None:
+                    job.advance(len(chunk_rows))
+    finally:
+        for future in futures:
+            future.cancel()
+        shm.close()
+        shm.unlink()
+    elapsed = time.perf_counter() - start_time
+
+    # Score of every combination, in the order they were given
+    scores = [row[maximize] for row in rows]
+
+    # Rank the combinations, ties keep the grid order like Backtest.optimize()
+    ranking = pd.DataFrame(rows)
+    ranking['grid_index'] = range(len(ranking))
+    ranking = ranking.sort_values(maximize, ascending=False, kind='stable', na_position='last').reset_index(drop=True)
+    ranking.index = ranking.index + 1
+    ranking.index.name = 'rank'
+
+    # The first combination is used when none of them made any trade
+    best_index = int(ranking['grid_index'].iloc[0])
+    return {
+        'ranking': ranking,
+        'best_params': param_combos[best_index],
+        'scores': scores,
+        'evaluated': len(param_combos),
+        'elapsed': elapsed,
+        'throughput': len(param_combos) / elapsed if elapsed > 0 else None,
+        'indicator_cache': cache_stats
+    }
@@ -0,0 +1,7 @@
+## LIBRARIES
+# Util
+import os
+import sys
+
+# The modules of the app are imported from the root of the project
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
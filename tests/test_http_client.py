@@ -0,0 +1,132 @@
+## LIBRARIES
+# Util
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+import http_client
+
+## CONSTANTS
+# Values of ALPHAVANTAGE_KEY and ALPHAVANTAGE_KEY_2 in static/tokens.json
+ALPHAVANTAGE_KEY = 'stub-key-1'
+ALPHAVANTAGE_KEY_2 = 'stub-key-2'
+RATE_LIMIT_NOTE = ('Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute '
+                   'and 500 calls per day.')
+
+## STUB SERVER
+# Local upstream server that records the requests it answers: their path, query and client port, which tells
+# whether a connection was reused. '/slow?delay=s' answers after some seconds and '/query' answers like
+# AlphaVantage, with a rate limit note for the first key.
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.requests.append({'path': url.path, 'params': params, 'port': self.client_address[1]})
+
+        if url.path == '/slow':
+            time.sleep(float(params.get('delay', 0)))
+        if url.path == '/query':
+            body = {'Note': RATE_LIMIT_NOTE} if params.get('apikey') == ALPHAVANTAGE_KEY else {'Symbol': params.get('symbol')}
+        else:
+            body = {'path': url.path, 'params': params}
+
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.lock = threading.Lock()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+# Fresh session, keys and timeouts for every test
+@pytest.fixture(autouse=True)
+def client_state(monkeypatch):
+    monkeypatch.setattr(http_client, '_session', None)
+    monkeypatch.setattr(http_client, '_in_flight', {})
+    monkeypatch.setattr(http_client, '_api_keys', [])
+    monkeypatch.setattr(http_client, '_next_key', 0)
+    monkeypatch.setattr(http_client, '_key_resting_until', {})
+    monkeypatch.setattr(http_client, 'CONNECT_TIMEOUT', http_client.CONNECT_TIMEOUT)
+    monkeypatch.setattr(http_client, 'READ_TIMEOUT', http_client.READ_TIMEOUT)
+
+## TESTS
+def test_identical_requests_in_flight_share_one_upstream_call(stub_server):
+    calls = 8
+    barrier = threading.Barrier(calls)
+    results = [None] * calls
+
+    def call(i):
+        barrier.wait()
+        results[i] = http_client.get_json(f'{stub_server.url}/slow', {'delay': '0.5', 'symbol': 'AAPL'})
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stub_server.requests) == 1
+    assert all(result == results[0] for result in results)
+    assert http_client.get_http_client_stats()['in_flight'] == 0
+
+def test_different_requests_are_not_coalesced(stub_server):
+    for symbol in ('AAPL', 'MSFT'):
+        http_client.get_json(f'{stub_server.url}/data', {'symbol': symbol})
+    assert [request['params']['symbol'] for request in stub_server.requests] == ['AAPL', 'MSFT']
+
+def test_pooled_connections_are_reused(stub_server):
+    for i in range(5):
+        http_client.get_json(f'{stub_server.url}/data', {'page': str(i)})
+    assert len(stub_server.requests) == 5
+    assert len({request['port'] for request in stub_server.requests}) == 1
+
+def test_read_timeout_is_applied(stub_server):
+    http_client.configure_http_client(read_timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        http_client.get_json(f'{stub_server.url}/slow', {'delay': '2'})
+    # Read timeouts are not retried
+    assert time.monotonic() - start < 1.5
+    assert len(stub_server.requests) == 1
+
+def test_alphavantage_query_rotates_keys_after_rate_limit(stub_server, monkeypatch):
+    monkeypatch.setattr(http_client, 'ALPHAVANTAGE_URL', f'{stub_server.url}/query')
+    http_client.configure_http_client([ALPHAVANTAGE_KEY, ALPHAVANTAGE_KEY_2])
+
+    assert http_client.alphavantage_query({'function': 'OVERVIEW', 'symbol': 'AAPL'}) == {'Symbol': 'AAPL'}
+    assert [request['params']['apikey'] for request in stub_server.requests] == [ALPHAVANTAGE_KEY, ALPHAVANTAGE_KEY_2]
+    assert http_client.get_http_client_stats()['resting_keys'] == 1
+
+    # The key over its limit rests, the next queries go to the other key
+    assert http_client.alphavantage_query({'function': 'OVERVIEW', 'symbol': 'MSFT'}) == {'Symbol': 'MSFT'}
+    assert stub_server.requests[-1]['params']['apikey'] == ALPHAVANTAGE_KEY_2
+
+def test_alphavantage_query_raises_when_every_key_is_limited(stub_server, monkeypatch):
+    monkeypatch.setattr(http_client, 'ALPHAVANTAGE_URL', f'{stub_server.url}/query')
+    http_client.configure_http_client([ALPHAVANTAGE_KEY])
+
+    with pytest.raises(ValueError, match='call frequency'):
+        http_client.alphavantage_query({'function': 'OVERVIEW', 'symbol': 'AAPL'})
@@ -0,0 +1,68 @@
+## LIBRARIES
+# Util
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import jobs
+import walkforward
+
+## FIXTURES
+@pytest.fixture
+def stock_data():
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, 200))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1e6},
+                        index=pd.bdate_range('2020-01-01', periods=200))
+
+# Names of the shared memory blocks created by the walk-forward runs
+@pytest.fixture
+def shared_blocks(monkeypatch):
+    names = []
+    share_stock_data = walkforward.share_stock_data
+
+    def share(stock_data):
+        shm, data_descriptor = share_stock_data(stock_data)
+        names.append(shm.name)
+        return shm, data_descriptor
+
+    monkeypatch.setattr(walkforward, 'share_stock_data', share)
+    return names
+
+# Job whose first submits return pending futures and the next one fails like a broken pool
+class FailingJob:
+    def __init__(self, submits):
+        self.submits = submits
+        self.futures = []
+
+    def set_total(self, total):
+        pass
+
+    def submit(self, fn, *args):
+        if len(self.futures) == self.submits:
+            raise BrokenProcessPool('A process in the process pool was terminated abruptly')
+        self.futures.append(Future())
+        return self.futures[-1]
+
+def assert_unlinked(name):
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+
+## TESTS
+def test_job_cancelled_before_the_first_window(stock_data, shared_blocks):
+    job = jobs.Job('walkforward', None)
+    job.cancel()
+    with pytest.raises(jobs.JobCancelled):
+        walkforward.run_walk_forward(stock_data, object, {}, [{}], 50, 25, 'Return [%]', job=job)
+    assert len(shared_blocks) == 1
+    assert_unlinked(shared_blocks[0])
+
+def test_failed_submit_cancels_the_submitted_windows(stock_data, shared_blocks):
+    job = FailingJob(submits=2)
+    with pytest.raises(BrokenProcessPool):
+        walkforward.run_walk_forward(stock_data, object, {}, [{}], 50, 25, 'Return [%]', job=job)
+    assert all(future.cancelled() for future in job.futures)
+    assert_unlinked(shared_blocks[0])
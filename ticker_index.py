@@ -0,0 +1,138 @@
+## LIBRARIES
+# Util
+import os
+import csv
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+
+## CONSTANTS
+# Listing of the symbols and names to search, the LISTING_STATUS file of AlphaVantage
+# (symbol,name,exchange,assetType,ipoDate,delistingDate,status). Download it with `python ingest_prices.py --listing`.
+LISTING_FILE = 'static/listings.csv'
+SEARCH_RESULTS = 10
+# Ranks of the matches, the best first
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, SYMBOL_SUBSTRING, NAME_SUBSTRING, FUZZY = range(6)
+# Typos are only looked for in queries as long as a symbol
+FUZZY_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.-'
+FUZZY_MAX_LENGTH = 6
+
+## INDEX
+# In-memory index of the symbols: sorted arrays of the symbols and of the words of the names for the prefix
+# searches, the joined symbols and names for the substring searches, and the symbols one edit away from the
+# query for the typos. Symbols added later rebuild the arrays, and the searches wait for them.
+class TickerIndex:
+    def __init__(self, listings):
+        self._lock = threading.Lock()
+        self._build(listings)
+
+    # Sorted arrays and joined strings of a listing of symbols and names
+    def _build(self, listings):
+        listings = {symbol.strip().upper(): name.strip() for symbol, name in listings if symbol and symbol.strip()}
+        self.symbols = sorted(listings)
+        self.names = [listings[symbol] for symbol in self.symbols]
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        words = sorted((word, i) for i, name in enumerate(self.names) for word in set(name.lower().split()))
+        self.words = [word for word, _ in words]
+        self.word_symbols = [i for _, i in words]
+
+        self.joined_symbols, self.symbol_offsets = _join(self.symbols)
+        self.joined_names, self.name_offsets = _join([name.lower() for name in self.names])
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return str(symbol).strip().upper() in self.positions
+
+    # Make new symbols searchable, e.g. the tickers downloaded after the app started. Returns the number added.
+    def add(self, listings):
+        with self._lock:
+            new = {symbol.strip().upper(): name for symbol, name in listings if symbol and symbol.strip() and symbol not in self}
+            if new:
+                self._build(list(zip(self.symbols, self.names)) + list(new.items()))
+            return len(new)
+
+    # Symbols and names that match a query, ranked by exact symbol, symbol prefix, name word prefix,
+    # symbol substring, name substring and symbols one typo away; shorter symbols first within a rank.
+    # The ranks are searched in order until there are enough results.
+    def search(self, query, limit=SEARCH_RESULTS):
+        query = query.strip()
+        if not query or limit < 1:
+            return []
+        with self._lock:
+            return self._search(query, limit)
+
+    def _search(self, query, limit):
+        symbol_query, name_query = query.upper(), query.lower()
+        matches = {
+            EXACT: lambda: [self.positions[symbol_query]] if symbol_query in self.positions else [],
+            SYMBOL_PREFIX: lambda: _prefix_range(self.symbols, symbol_query),
+            NAME_PREFIX: lambda: (self.word_symbols[j] for j in _prefix_range(self.words, name_query)),
+            SYMBOL_SUBSTRING: lambda: _find_all(self.joined_symbols, self.symbol_offsets, symbol_query),
+            NAME_SUBSTRING: lambda: _find_all(self.joined_names, self.name_offsets, name_query),
+            FUZZY: lambda: (self.positions[symbol] for symbol in _edits(symbol_query) if symbol in self.positions)
+            if len(symbol_query) <= FUZZY_MAX_LENGTH else []
+        }
+
+        found = {}
+        for rank in sorted(matches):
+            positions = set(matches[rank]()).difference(found)
+            best = heapq.nsmallest(limit - len(found), positions, key=lambda i: (len(self.symbols[i]), self.symbols[i]))
+            found.update(dict.fromkeys(best))
+            if len(found) >= limit:
+                break
+        return [{'symbol': self.symbols[i], 'name': self.names[i]} for i in found]
+
+## FUNCTIONS
+# Symbols and names of a listing file, only the active ones when the file has their status
+def load_listing(path=LISTING_FILE):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, newline='', encoding='utf-8') as file:
+        return [(row['symbol'], row.get('name') or '') for row in csv.DictReader(file)
+                if (row.get('status') or 'active').lower() == 'active']
+
+# Index of the symbols of the listing file plus other known symbols (e.g. the cached tickers), which are
+# searchable by their symbol even when they are not in the listing
+def build_ticker_index(listing_path=LISTING_FILE, symbols=()):
+    listings = load_listing(listing_path)
+    listed = {symbol.upper() for symbol, _ in listings}
+    listings += [(symbol, '') for symbol in symbols if symbol.upper() not in listed]
+    return TickerIndex(listings)
+
+## HELPERS
+# Positions of the sorted values that start with a prefix
+def _prefix_range(values, prefix):
+    return range(bisect_left(values, prefix), bisect_right(values, prefix + '\uffff'))
+
+# Values joined by new lines, with the offset where every value starts
+def _join(values):
+    offsets, offset = [], 0
+    for value in values:
+        offsets.append(offset)
+        offset += len(value) + 1
+    return '\n'.join(values), offsets
+
+# Positions of the joined values that contain a text
+def _find_all(joined, offsets, text):
+    if '\n' in text:
+        return []
+    positions = []
+    start = joined.find(text)
+    while start != -1:
+        i = bisect_right(offsets, start) - 1
+        positions.append(i)
+        # Continue from the next value, a value only matches once
+        start = joined.find(text, offsets[i + 1]) if i + 1 < len(offsets) else -1
+    return positions
+
+# Symbols one deletion, transposition, replacement or insertion away from a query
+def _edits(query):
+    splits = [(query[:i], query[i:]) for i in range(len(query) + 1)]
+    deletes = [left + right[1:] for left, right in splits if right]
+    transposes = [left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1]
+    replaces = [left + c + right[1:] for left, right in splits if right for c in FUZZY_ALPHABET]
+    inserts = [left + c + right for left, right in splits for c in FUZZY_ALPHABET]
+    return dict.fromkeys(deletes + transposes + replaces + inserts)
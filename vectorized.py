@@ -0,0 +1,156 @@
+## LIBRARIES
+# Util
+import sys
+from math import copysign
+from types import SimpleNamespace
+
+import numpy as np
+
+# Backtesting
+from backtesting._stats import compute_stats
+from backtesting._util import _Data, _indicator_warmup_nbars
+
+## CONSTANTS
+# Fraction of the available cash used by the orders of the strategies (default size of Strategy.buy/sell)
+ORDER_SIZE = 1 - sys.float_info.epsilon
+
+## FUNCTIONS
+# A strategy supports the vectorized mode if it declares its signals as arrays
+def has_signals(strategy_class):
+    return callable(getattr(strategy_class, 'signals', None))
+
+# Run a backtest with the vectorized simulator when the strategy declares its signals, otherwise with Backtest.run()
+def run_fast(bt, **params):
+    if has_signals(bt._strategy):
+        result = run_signals(bt, **params)
+        if result is not None:
+            return result
+    return bt.run(**params)
+
+# Strategy instance and actions of the signals of a backtest, None if the broker settings are not supported.
+#
+# `signals()` is called after `init()` and returns the boolean arrays `buy` and `sell` (and optionally `close`)
+# with the bars where `next()` would call `self.buy()`, `self.sell()` or `self.position.close()`, with that
+# priority when several are set. The actions are 1 (buy), -1 (sell), 2 (close the position) or 0, only from the
+# first bar next() is called and while the order can still be filled on the next bar.
+def get_signal_actions(bt, **params):
+    data = _Data(bt._data.copy(deep=False))
+    broker = bt._broker(data=data)
+    strategy = bt._strategy(broker, data, params)
+    strategy.init()
+    data._update()
+
+    if not broker._exclusive_orders or broker._hedging or broker._trade_on_close:
+        return None
+
+    n_bars = len(bt._data)
+    start = 1 + _indicator_warmup_nbars(strategy)
+    signals = strategy.signals()
+    buy, sell = np.asarray(signals[0], dtype=bool), np.asarray(signals[1], dtype=bool)
+    close = np.asarray(signals[2], dtype=bool) if len(signals) > 2 else np.zeros(n_bars, dtype=bool)
+
+    actions = np.where(buy, 1, np.where(sell, -1, np.where(close, 2, 0)))
+    actions[:start] = 0
+    actions[n_bars - 1:] = 0
+    return strategy, broker, actions, start
+
+# Vectorized equivalent of Backtest.run() for strategies that declare `signals()`.
+#
+# Orders are market orders filled at the next open, with the commission and exclusive orders of the Backtest,
+# so the stats are the same as the ones of Backtest.run().
+# Returns None when the simulation cannot be reproduced (the account runs out of money).
+def run_signals(bt, **params):
+    signal_actions = get_signal_actions(bt, **params)
+    if signal_actions is None:
+        return None
+    strategy, broker, actions, start = signal_actions
+    return simulate_actions(bt._data, broker, actions, start, strategy)
+
+# Vectorized backtest of the bars [first_bar, last_bar) of a Backtest, with its initial cash. The indicators are
+# computed over the whole data, so the window trades from its first bar with indicators warmed up by the bars
+# before it, and every window of the same data shares them through the indicator cache.
+# Returns None when the strategy has no signals or the simulation cannot be reproduced.
+def run_window(bt, first_bar, last_bar, **params):
+    signal_actions = get_signal_actions(bt, **params) if has_signals(bt._strategy) else None
+    if signal_actions is None:
+        return None
+    _, broker, actions, start = signal_actions
+    window_actions = actions[first_bar:last_bar].copy()
+    # Orders of the last bar would be filled after the window
+    window_actions[-1:] = 0
+    return simulate_actions(bt._data.iloc[first_bar:last_bar], broker, window_actions, max(start - first_bar, 0))
+
+# Event loop over the bars with an action, `start` is the first bar of the strategy.
+# The indicator values of the strategy instance, if given, are added to the trades like Backtest.run() does.
+def simulate_actions(ohlc_data, broker, actions, start, strategy=None):
+    n_bars = len(ohlc_data)
+    signal_bars = np.flatnonzero(actions)
+
+    open_prices = ohlc_data.Open.to_numpy(dtype=float)
+    close_prices = ohlc_data.Close.to_numpy(dtype=float)
+    index = ohlc_data.index
+
+    cash = broker._cash
+    size = 0
+    entry_price = 0.0
+    entry_bar = 0
+    closed_trades = []
+
+    # Cash, position size and entry price from every fill bar on
+    segment_bars = [start]
+    segment_state = [(cash, size, entry_price)]
+
+    for bar in signal_bars:
+        action = actions[bar]
+        fill_bar = bar + 1
+        price = open_prices[fill_bar]
+
+        # Exclusive orders close the open trade before the new one is opened
+        if size:
+            commission = broker._commission(size, price)
+            pl = size * (price - entry_price)
+            cash += pl - commission
+            commissions = commission + broker._commission(size, entry_price)
+            closed_trades.append(SimpleNamespace(
+                size=size, entry_bar=entry_bar, exit_bar=fill_bar, entry_price=entry_price, exit_price=price,
+                sl=None, tp=None, pl=pl - commissions,
+                pl_pct=copysign(1, size) * (price / entry_price - 1) - commissions / (abs(size) * entry_price),
+                _commissions=commissions, entry_time=index[entry_bar], exit_time=index[fill_bar], tag=None))
+            size = 0
+
+        if action != 2:
+            # Size the order with the available cash, the broker cancels it if not even a unit can be bought
+            order_size = copysign(ORDER_SIZE, action)
+            adjusted_price = price * (1 + copysign(broker._spread, order_size))
+            adjusted_price_plus_commission = adjusted_price + broker._commission(order_size, price) / abs(order_size)
+            units = int((max(0, cash) * broker._leverage * ORDER_SIZE) // adjusted_price_plus_commission)
+            if units:
+                size = int(copysign(units, action))
+                entry_price = adjusted_price
+                entry_bar = fill_bar
+                cash -= broker._commission(size, entry_price)
+
+        segment_bars.append(fill_bar)
+        segment_state.append((cash, size, entry_price))
+
+    # Equity at the close of every bar, like the broker logs it
+    equity = np.empty(n_bars)
+    segment_bars.append(n_bars)
+    for i, (segment_cash, segment_size, segment_entry) in enumerate(segment_state):
+        bars = slice(segment_bars[i], segment_bars[i + 1])
+        equity[bars] = segment_cash + (close_prices[bars] * segment_size - segment_size * segment_entry)
+    if start < n_bars:
+        # Bars before the first call to next() take the first logged equity
+        equity[:start] = equity[start]
+        if (equity[start:] <= 0).any():
+            return None
+    else:
+        equity[:] = cash
+
+    return compute_stats(
+        trades=closed_trades,
+        equity=equity,
+        ohlc_data=ohlc_data,
+        risk_free_rate=0.0,
+        strategy_instance=strategy,
+    )
@@ -0,0 +1,126 @@
+## LIBRARIES
+# Util
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from json_values import to_float
+
+# Backtesting
+from backtest_tasks import INITIAL_CASH, make_backtest
+from vectorized import run_fast, run_window
+from sweep import share_stock_data, attach_stock_data
+from portfolio import get_portfolio_stats
+# Background jobs
+import jobs
+
+## CONSTANTS
+# Statistics of the out-of-sample run of every window
+WINDOW_STATS = ['Return [%]', 'Sharpe Ratio', 'Max. Drawdown [%]', '# Trades', 'Win Rate [%]', 'Exposure Time [%]']
+# Largest number of parameter combinations optimized in every window
+MAX_WALK_FORWARD_COMBOS = 2000
+
+## WORKER TASKS
+# Optimize a window on its in-sample bars and run the best combination on its out-of-sample bars.
+# The indicators of every combination are computed once over the whole shared data and reused by all the
+# windows evaluated by the same worker.
+def walk_forward_window_task(data_descriptor, strategy_class, bt_document, param_combos, window, maximize):
+    stock_data = attach_stock_data(data_descriptor)
+    bt = make_backtest(stock_data, strategy_class, bt_document)
+
+    # Runs without trades are not ranked, ties keep the first combination like Backtest.optimize()
+    scores = []
+    for params in param_combos:
+        stats = _run_bars(bt, strategy_class, bt_document, window['in_sample'], params)
+        scores.append(float(stats[maximize]) if stats['# Trades'] else math.nan)
+    best_index = int(np.nanargmax(scores)) if not np.isnan(scores).all() else 0
+    best_params = param_combos[best_index]
+
+    result = _run_bars(bt, strategy_class, bt_document, window['out_of_sample'], best_params)
+    dates = bt._data.index
+    return {
+        'in_sample': [dates[window['in_sample'][0]].isoformat(), dates[window['in_sample'][1] - 1].isoformat()],
+        'out_of_sample': [dates[window['out_of_sample'][0]].isoformat(), dates[window['out_of_sample'][1] - 1].isoformat()],
+        'opt_values': best_params,
+        'in_sample_score': None if math.isnan(scores[best_index]) else scores[best_index],
+        'stats': {column: to_float(result[column]) for column in WINDOW_STATS},
+        'equity': result['_equity_curve']['Equity']
+    }
+
+## FUNCTIONS
+# Bar ranges of the rolling windows: every window is optimized on `in_sample_bars` bars and evaluated on the
+# `out_of_sample_bars` that follow, and the next window moves forward by the out-of-sample bars, so the
+# out-of-sample ranges are contiguous. Anchored windows keep the first bar and grow instead.
+def make_windows(n_bars, in_sample_bars, out_of_sample_bars, anchored=False):
+    if in_sample_bars < 2 or out_of_sample_bars < 2:
+        raise ValueError('The in-sample and out-of-sample windows need at least 2 bars')
+    windows = []
+    for start in range(in_sample_bars, n_bars - 1, out_of_sample_bars):
+        in_sample = (0 if anchored else start - in_sample_bars, start)
+        out_of_sample = (start, min(start + out_of_sample_bars, n_bars))
+        if out_of_sample[1] - out_of_sample[0] < 2:
+            break
+        windows.append({'in_sample': in_sample, 'out_of_sample': out_of_sample})
+    if not windows:
+        raise ValueError(f'Not enough data for a window of {in_sample_bars} + {out_of_sample_bars} bars')
+    return windows
+
+# Chain the out-of-sample equity curves of the windows, every window starts with the final equity of the previous one
+def stitch_equity_curves(equity_curves):
+    capital = INITIAL_CASH
+    stitched = []
+    for equity in equity_curves:
+        stitched.append(equity / INITIAL_CASH * capital)
+        capital = stitched[-1].iloc[-1]
+    return pd.concat(stitched)
+
+# Walk-forward analysis of a strategy over a grid of parameter combinations, with the windows run in parallel
+# on the worker pool. When a job is given, its progress is updated with every window and its cancellation is honoured.
+def run_walk_forward(stock_data, strategy_class, bt_document, param_combos, in_sample_bars, out_of_sample_bars,
+                     maximize, anchored=False, job=None):
+    if not param_combos:
+        raise ValueError('No parameter combinations to evaluate')
+    submit = job.submit if job is not None else jobs.get_process_pool().submit
+    windows = make_windows(len(stock_data), in_sample_bars, out_of_sample_bars, anchored)
+    if job is not None:
+        job.set_total(len(windows))
+
+    start_time = time.perf_counter()
+    shm, data_descriptor = share_stock_data(stock_data)
+    futures = {}
+    try:
+        for i, window in enumerate(windows):
+            futures[submit(walk_forward_window_task, data_descriptor, strategy_class, bt_document, param_combos,
+                           window, maximize)] = i
+        results = [None] * len(windows)
+        completed = job.iter_completed(futures) if job is not None else futures
+        for future in completed:
+            results[futures[future]] = future.result()
+            if job is not None:
+                job.advance()
+    finally:
+        for future in futures:
+            future.cancel()
+        shm.close()
+        shm.unlink()
+    elapsed = time.perf_counter() - start_time
+
+    equity = stitch_equity_curves([result.pop('equity') for result in results])
+    return {
+        'windows': results,
+        'equity': equity,
+        'stats': get_portfolio_stats(equity),
+        'evaluated': len(windows) * len(param_combos),
+        'elapsed': elapsed
+    }
+
+## HELPERS
+# Run a combination on a range of bars, strategies without signals are run on the bars alone
+def _run_bars(bt, strategy_class, bt_document, bars, params):
+    result = run_window(bt, bars[0], bars[1], **params)
+    if result is None:
+        window_bt = make_backtest(bt._data.iloc[bars[0]:bars[1]], strategy_class, bt_document)
+        result = run_fast(window_bt, **params)
+    return result